@@ -0,0 +1,103 @@
+# Amostra estratificada para a prévia rápida dos cards
+# Os estratos são as combinações (Regiao, Projeto, Ano), as mesmas dos filtros da barra lateral,
+# então um filtro sempre seleciona estratos inteiros e o total de linhas filtradas é exato; só os
+# valores dentro de cada estrato são estimados. Cada linha recebe uma chave pseudoaleatória e fica
+# na amostra se a chave for menor que a fração pedida ou se estiver entre as menores chaves do seu
+# estrato (um mínimo por estrato, para estratos pequenos). Essa regra não depende da ordem de
+# leitura: amostras de blocos (ou partições) diferentes se juntam aplicando a mesma regra à união
+
+import math
+
+import pandas as pd
+
+import cubo
+
+# Dimensões dos estratos
+DIMENSOES = ["Regiao", "Projeto", "Ano"]
+
+# Colunas guardadas de cada linha sorteada
+COLUNAS = DIMENSOES + cubo.METRICAS + ["chave"]
+
+# Linhas mantidas em cada estrato, mesmo quando a fração daria menos
+MINIMO_POR_ESTRATO = 30
+
+# Valor da normal para o intervalo de confiança de 95%
+Z_95 = 1.96
+
+# Semente das chaves (reprodutível): a chave de uma linha é o hash do seu conteúdo com a
+# semente, então a mesma linha cai sempre na amostra, em qualquer bloco, partição ou carga
+SEMENTE = 0
+
+# Colunas do hash que dá a chave de cada linha
+COLUNAS_CHAVE = ["Data", "Regiao", "Projeto"] + cubo.METRICAS
+
+
+# Mantém as linhas com chave abaixo da fração e as "minimo" menores chaves de cada estrato
+def _podar(base, fracao, minimo):
+    posicao = base.groupby(DIMENSOES, observed=True, sort=False)["chave"].rank(method="first")
+    return base[(base["chave"] < fracao) | (posicao <= minimo)]
+
+
+# Sorteia a amostra de um DataFrame de linhas brutas (ou de um bloco dele)
+def agregar(df, fracao, minimo=MINIMO_POR_ESTRATO):
+    base = df[["Regiao", "Projeto"] + cubo.METRICAS].copy()
+    base["Ano"] = df["Data"].dt.year.astype("int16")
+    base["chave"] = pd.util.hash_pandas_object(df[COLUNAS_CHAVE], index=False,
+                                               hash_key=f"{SEMENTE:016d}").to_numpy() / 2.0 ** 64
+    base = base.dropna(subset=["Regiao", "Projeto"])
+    return _podar(base[COLUNAS], fracao, minimo)
+
+
+# Junta amostras parciais (de blocos diferentes) em uma só
+def combinar(partes, fracao, minimo=MINIMO_POR_ESTRATO):
+    partes = [p for p in partes if len(p)]
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS)
+    juntas = pd.concat(partes, ignore_index=True)
+    for dimensao in ["Regiao", "Projeto"]:
+        juntas[dimensao] = juntas[dimensao].astype(str)
+    return _podar(juntas, fracao, minimo)
+
+
+def finalizar(amostra):
+    amostra = amostra.sort_values(DIMENSOES, kind="stable").reset_index(drop=True)
+    for dimensao in ["Regiao", "Projeto"]:
+        amostra[dimensao] = amostra[dimensao].astype("category")
+    amostra["Ano"] = amostra["Ano"].astype("int16")
+    for metrica in cubo.METRICAS:
+        amostra[metrica] = amostra[metrica].astype("float64")
+    return amostra
+
+
+# Acrescenta a cada linha sorteada quantas linhas o seu estrato tem de verdade (do cubo)
+def com_estratos(amostra, df_cubo):
+    estratos = df_cubo.groupby(DIMENSOES, observed=True)[cubo.LINHAS].sum().rename("N_estrato").reset_index()
+    indice = pd.MultiIndex.from_arrays([estratos["Regiao"].astype(str), estratos["Projeto"].astype(str), estratos["Ano"]])
+    posicoes = indice.get_indexer(pd.MultiIndex.from_arrays([amostra["Regiao"].astype(str),
+                                                              amostra["Projeto"].astype(str),
+                                                              amostra["Ano"]]))
+    amostra = amostra.copy()
+    amostra["N_estrato"] = estratos["N_estrato"].to_numpy()[posicoes]
+    return amostra
+
+
+# Estimativas dos cards a partir da amostra já filtrada: o total e a média de cada métrica,
+# cada um com a margem do intervalo de confiança (estimador estratificado, com correção de
+# população finita). Devolve {"linhas": N, "total": {metrica: (valor, margem)}, "media": {...}}
+def estimar(amostra, z=Z_95):
+    grupos = amostra.groupby(DIMENSOES, observed=True)
+    tamanhos = grupos["N_estrato"].first().astype("float64")
+    estimativa = {"linhas": int(tamanhos.sum()), "total": {}, "media": {}}
+    for metrica in cubo.METRICAS:
+        estatisticas = grupos[metrica].agg(["count", "mean", "var"])
+        estatisticas = estatisticas[estatisticas["count"] > 0]
+        n = estatisticas["count"].astype("float64")
+        N = tamanhos.loc[estatisticas.index]
+        total = (N * estatisticas["mean"]).sum()
+        # Estratos com um único valor sorteado não têm variância estimada
+        variancia = (N * N * (1 - n / N).clip(lower=0) * estatisticas["var"].fillna(0) / n).sum()
+        margem = z * math.sqrt(variancia)
+        linhas = N.sum()
+        estimativa["total"][metrica] = (total, margem)
+        estimativa["media"][metrica] = (total / linhas, margem / linhas) if linhas else (float("nan"), float("nan"))
+    return estimativa
@@ -0,0 +1,76 @@
+# Atualização dos dados em segundo plano (stale-while-revalidate)
+# A versão já carregada continua sendo servida enquanto uma thread verifica, a cada intervalo,
+# se o arquivo de dados mudou e monta a versão nova; quando ela fica pronta, toma o lugar da
+# antiga de uma só vez. Só a primeira carga do processo faz alguém esperar
+
+import threading
+import time
+
+
+class Atualizador:
+    # "obter_versao()" identifica o estado atual do arquivo (muda quando ele muda),
+    # "carregar(versao)" monta todos os dados daquela versão e "ao_trocar()", se dado, é chamado
+    # depois que uma versão nova toma o lugar da antiga
+    def __init__(self, obter_versao, carregar, intervalo_s, ao_trocar=None):
+        self._obter_versao = obter_versao
+        self._carregar = carregar
+        self.intervalo_s = intervalo_s
+        self._ao_trocar = ao_trocar
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self._atual = None
+        self.atualizando = False
+        self.ultimo_erro = None
+
+    def _montar(self, versao):
+        return {"versao": versao,
+                "carregado_em": time.time(),
+                "dados": self._carregar(versao)}
+
+    # Devolve o pacote atual (versão, momento da carga e dados). Os dados são compartilhados
+    # entre as sessões e não devem ser alterados
+    def atual(self):
+        if self._atual is None:
+            with self._trava:
+                # Várias sessões chegando juntas no início esperam uma única carga
+                if self._atual is None:
+                    self._atual = self._montar(self._obter_versao())
+                    self._iniciar()
+        return self._atual
+
+    def _iniciar(self):
+        if self.intervalo_s <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._rodar, name="atualizador_dados", daemon=True)
+        self._thread.start()
+
+    def _rodar(self):
+        while not self._parar.wait(self.intervalo_s):
+            self.verificar()
+
+    # Monta a versão nova se o arquivo mudou; enquanto isso a anterior segue sendo servida.
+    # Devolve True quando houve troca
+    def verificar(self):
+        try:
+            versao = self._obter_versao()
+            if versao == self.atual()["versao"]:
+                return False
+            self.atualizando = True
+            novo = self._montar(versao)
+        except Exception as erro:
+            # Uma falha (arquivo sendo trocado, por exemplo) não derruba a thread:
+            # a versão anterior continua no ar e a próxima verificação tenta de novo
+            self.ultimo_erro = f"{type(erro).__name__}: {erro}"
+            return False
+        finally:
+            self.atualizando = False
+        # Troca atômica: quem já pegou o pacote antigo termina a execução com ele
+        self._atual = novo
+        self.ultimo_erro = None
+        if self._ao_trocar is not None:
+            self._ao_trocar()
+        return True
+
+    def parar(self):
+        self._parar.set()
@@ -0,0 +1,330 @@
+# Backend SQLite (biblioteca padrão) da dashboard
+# Alternativa ao caminho em pandas: o CSV é carregado em blocos para um banco SQLite em disco,
+# com índices em (Regiao, Projeto, Ano) e em Data. O cubo e o histograma do boxplot são
+# agregados pelo próprio banco (GROUP BY) e os filtros da barra lateral viram cláusulas WHERE,
+# então a memória da dashboard não depende do tamanho do arquivo, só do resultado das consultas.
+# Com a prévia ligada, a amostra estratificada (amostra.py) é sorteada durante a carga e fica
+# numa tabela própria
+
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+import amostra
+import cubo
+import estatisticas_box
+import granularidades
+import trechos_csv
+from cache_colunar import COLUNAS, caminhos_cache, impressao_digital, inicio_incremental
+from ingestao import linhas_por_bloco, preparar_bloco
+
+# Versão do esquema do banco: mudar aqui força a reconstrução
+VERSAO_BANCO = 2
+
+# Tipos das colunas da tabela de linhas; a Data fica em nanossegundos (o mesmo valor do pandas)
+# e o Ano é gravado junto para os filtros usarem o índice
+TIPOS = {"Data": "INTEGER NOT NULL",
+         "Nome": "TEXT",
+         "Sexo": "TEXT",
+         "Regiao": "TEXT",
+         "Projeto": "TEXT",
+         "Funcionarios": "INTEGER",
+         "Tempo_conclusao_dias": "INTEGER",
+         "Custo_Reais": "REAL",
+         "Ano": "INTEGER NOT NULL"}
+
+# Colunas de contagem do cubo (inteiras); as demais estatísticas são float
+CONTAGENS = [cubo.LINHAS] + [cubo.coluna_qtd(m) for m in cubo.METRICAS]
+
+# Quantos resultados de cubo e histograma (por combinação de filtros) ficam guardados:
+# os reruns da mesma seleção, de qualquer sessão, não voltam ao banco
+RESULTADOS_EM_CACHE = 32
+
+# Tempo de leitura de cada linha do cubo diário, usado para prever quanto o cubo filtrado vai
+# demorar enquanto nenhuma consulta foi medida (cerca de 13 µs numa máquina de 1 núcleo)
+SEGUNDOS_POR_LINHA_CUBO = 1e-5
+
+
+# O banco fica na mesma pasta do cache colunar
+def caminho_banco(caminho_csv):
+    caminho_arrow, _ = caminhos_cache(caminho_csv)
+    return os.path.splitext(caminho_arrow)[0] + ".db"
+
+
+def _criar_esquema(conexao):
+    colunas = ", ".join(f"{nome} {tipo}" for nome, tipo in TIPOS.items())
+    conexao.execute(f"CREATE TABLE linhas ({colunas})")
+    conexao.execute("CREATE INDEX linhas_filtros ON linhas (Regiao, Projeto, Ano)")
+    conexao.execute("CREATE INDEX linhas_data ON linhas (Data)")
+    conexao.execute("CREATE TABLE meta (chave TEXT PRIMARY KEY, valor TEXT)")
+
+
+# Insere no banco as linhas lidas de um trecho do CSV, em blocos de tamanho limitado. Com
+# "fracao_previa" > 0 devolve também a amostra estratificada do trecho, sorteada bloco a bloco
+def _inserir(conexao, caminho_csv, fonte, memoria_max_mb, fracao_previa=0):
+    espacos = ", ".join("?" * len(TIPOS))
+    sorteadas = None
+    leitor = pd.read_csv(fonte, usecols=COLUNAS, chunksize=linhas_por_bloco(caminho_csv, memoria_max_mb))
+    with leitor:
+        for bloco in leitor:
+            bloco = preparar_bloco(bloco)
+            if fracao_previa > 0:
+                parcial = amostra.agregar(bloco, fracao_previa)
+                sorteadas = parcial if sorteadas is None else amostra.combinar([sorteadas, parcial], fracao_previa)
+            bloco["Ano"] = bloco["Data"].dt.year
+            bloco["Data"] = bloco["Data"].astype("int64")
+            # Valores vazios (NaN) viram NULL no SQLite
+            conexao.executemany(f"INSERT INTO linhas VALUES ({espacos})",
+                                bloco[list(TIPOS)].astype(object).itertuples(index=False, name=None))
+    return sorteadas
+
+
+# Grava a amostra da prévia, juntando-a à que já estava no banco (carga incremental)
+def _gravar_amostra(conexao, sorteadas, fracao_previa, incremental):
+    partes = [sorteadas if sorteadas is not None else pd.DataFrame(columns=amostra.COLUNAS)]
+    if incremental:
+        partes.append(pd.read_sql_query(f"SELECT {', '.join(amostra.COLUNAS)} FROM amostra", conexao))
+    juntas = amostra.combinar(partes, fracao_previa)
+    conexao.execute("DROP TABLE IF EXISTS amostra")
+    conexao.execute(f"CREATE TABLE amostra (Regiao TEXT, Projeto TEXT, Ano INTEGER, "
+                    f"{', '.join(f'{m} REAL' for m in cubo.METRICAS)}, chave REAL)")
+    conexao.executemany(f"INSERT INTO amostra VALUES ({', '.join('?' * len(amostra.COLUNAS))})",
+                        juntas[amostra.COLUNAS].astype(object).itertuples(index=False, name=None))
+    conexao.execute("CREATE INDEX amostra_filtros ON amostra (Regiao, Projeto, Ano)")
+
+
+# Agrega o cubo e o histograma dentro do banco, com as mesmas colunas dos resumos em pandas.
+# Grupos com Regiao ou Projeto vazios ficam de fora, como no groupby do pandas. A tabela de
+# estratos guarda, por (Regiao, Projeto, Ano), as linhas (tamanho do estrato na prévia) e as
+# linhas do cubo diário (para prever o tempo do cubo filtrado)
+def _agregar(conexao):
+    estatisticas = ["COUNT(*) AS Linhas"]
+    for metrica in cubo.METRICAS:
+        valor = f"CAST({metrica} AS REAL)"
+        estatisticas += [f"SUM({valor}) AS {metrica}",
+                         f"COUNT({metrica}) AS {cubo.coluna_qtd(metrica)}",
+                         f"MIN({valor}) AS {cubo.coluna_min(metrica)}",
+                         f"MAX({valor}) AS {cubo.coluna_max(metrica)}",
+                         f"SUM({valor} * {valor}) AS {cubo.coluna_quad(metrica)}"]
+    validas = "WHERE Regiao IS NOT NULL AND Projeto IS NOT NULL"
+    conexao.execute("DROP TABLE IF EXISTS cubo")
+    conexao.execute("DROP TABLE IF EXISTS histograma")
+    conexao.execute("DROP TABLE IF EXISTS estratos")
+    conexao.execute(f"CREATE TABLE cubo AS SELECT Regiao, Projeto, Ano, Data, {', '.join(estatisticas)} "
+                    f"FROM linhas {validas} GROUP BY Regiao, Projeto, Ano, Data")
+    conexao.execute(f"CREATE TABLE histograma AS "
+                    f"SELECT Regiao, Projeto, Ano, {estatisticas_box.COLUNA} AS valor, COUNT(*) AS qtd "
+                    f"FROM linhas {validas} AND {estatisticas_box.COLUNA} IS NOT NULL "
+                    f"GROUP BY Regiao, Projeto, Ano, valor")
+    conexao.execute(f"CREATE TABLE estratos AS SELECT Regiao, Projeto, Ano, SUM({cubo.LINHAS}) AS N_estrato, "
+                    f"COUNT(*) AS linhas_cubo FROM cubo GROUP BY Regiao, Projeto, Ano")
+    conexao.execute("CREATE INDEX cubo_filtros ON cubo (Regiao, Projeto, Ano)")
+    conexao.execute("CREATE INDEX histograma_filtros ON histograma (Regiao, Projeto, Ano)")
+
+
+def _ler_estado(caminho):
+    try:
+        with sqlite3.connect(f"file:{caminho}?mode=ro", uri=True) as conexao:
+            valor = conexao.execute("SELECT valor FROM meta WHERE chave = 'estado'").fetchone()
+        return json.loads(valor[0]) if valor else None
+    except (sqlite3.Error, ValueError):
+        return None
+
+
+def _gravar_estado(conexao, caminho_csv, digital, lido_ate, fracao_previa):
+    estado = dict(digital,
+                  versao_banco=VERSAO_BANCO,
+                  fracao_previa=fracao_previa,
+                  lido_ate=lido_ate,
+                  assinatura=trechos_csv.assinatura(caminho_csv, lido_ate) if lido_ate else None)
+    conexao.execute("INSERT OR REPLACE INTO meta VALUES ('estado', ?)", (json.dumps(estado),))
+
+
+# Garante que o banco corresponde ao CSV e devolve o caminho dele. Se o CSV só ganhou linhas
+# no final, elas são inseridas e os agregados refeitos; senão o banco é montado do zero em um
+# arquivo temporário que substitui o anterior no final (quem ainda lê o antigo não é afetado).
+# Mudar a fração da prévia também refaz o banco, já que a amostra guardada é de outra fração
+def preparar(caminho_csv, memoria_max_mb, incremental=True, fracao_previa=0):
+    caminho = caminho_banco(caminho_csv)
+    digital = impressao_digital(caminho_csv)
+    lido_ate = trechos_csv.fim_ultima_linha(caminho_csv, digital["tamanho"])
+    estado = _ler_estado(caminho)
+
+    if (estado is not None and estado.get("versao_banco") == VERSAO_BANCO
+            and estado.get("fracao_previa") == fracao_previa):
+        if all(estado.get(chave) == valor for chave, valor in digital.items()):
+            return caminho
+        inicio = inicio_incremental(caminho_csv, estado, digital) if incremental else None
+        if inicio is not None:
+            conexao = sqlite3.connect(caminho)
+            try:
+                # Uma única transação: leitores continuam vendo a versão anterior até o commit
+                with conexao, trechos_csv.abrir_trecho(caminho_csv, inicio, lido_ate) as fonte:
+                    sorteadas = _inserir(conexao, caminho_csv, fonte, memoria_max_mb, fracao_previa)
+                    if fracao_previa > 0:
+                        _gravar_amostra(conexao, sorteadas, fracao_previa, incremental=True)
+                    _agregar(conexao)
+                    _gravar_estado(conexao, caminho_csv, digital, lido_ate, fracao_previa)
+            finally:
+                conexao.close()
+            return caminho
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    conexao = sqlite3.connect(temporario)
+    try:
+        with conexao, trechos_csv.abrir_trecho(caminho_csv, 0, lido_ate) as fonte:
+            _criar_esquema(conexao)
+            sorteadas = _inserir(conexao, caminho_csv, fonte, memoria_max_mb, fracao_previa)
+            if fracao_previa > 0:
+                _gravar_amostra(conexao, sorteadas, fracao_previa, incremental=False)
+            _agregar(conexao)
+            _gravar_estado(conexao, caminho_csv, digital, lido_ate, fracao_previa)
+        conexao.close()
+        os.replace(temporario, caminho)
+    finally:
+        conexao.close()
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return caminho
+
+
+# Forma canônica dos filtros (tuplas ordenadas), usada como chave dos resultados guardados
+def _chave_filtros(regioes, projetos, anos):
+    return (tuple(sorted(map(str, regioes))), tuple(sorted(map(str, projetos))), tuple(sorted(map(int, anos))))
+
+
+# Monta a cláusula WHERE dos filtros da barra lateral e seus parâmetros
+def _filtro(regioes, projetos, anos):
+    condicoes = []
+    parametros = []
+    for coluna, valores in zip(["Regiao", "Projeto", "Ano"], _chave_filtros(regioes, projetos, anos)):
+        valores = list(valores)
+        condicoes.append(f"{coluna} IN ({', '.join('?' * len(valores))})")
+        parametros += valores
+    return " AND ".join(condicoes), parametros
+
+
+# Consultas da dashboard sobre o banco; mesma interface de consultas.ConsultasPandas
+class ConsultasSQLite:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        # O Streamlit atende cada sessão em uma thread, e uma conexão SQLite não deve ser
+        # usada por threads diferentes: cada thread abre a sua, somente leitura
+        self._local = threading.local()
+        self._opcoes = None
+        self._periodo = None
+        self._com_amostra = None
+        # Filtros cujo cubo diário já está guardado e quanto a última consulta levou por linha
+        # do cubo, para prever o tempo do próximo (ver segundos_previstos)
+        self._cubos_guardados = OrderedDict()
+        self._segundos_por_linha = SEGUNDOS_POR_LINHA_CUBO
+        self._trava = threading.Lock()
+        # Resultados compartilhados entre as sessões; não devem ser alterados
+        self._cubo = functools.lru_cache(maxsize=RESULTADOS_EM_CACHE)(self._consultar_cubo)
+        self._histograma = functools.lru_cache(maxsize=RESULTADOS_EM_CACHE)(self._consultar_histograma)
+
+    def _conexao(self):
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(f"file:{self.caminho}?mode=ro", uri=True)
+            self._local.conexao = conexao
+        return conexao
+
+    # Um processo criado por fork herda as conexões abertas, que não podem ser usadas nele:
+    # o processo filho chama isto e abre as suas
+    def reabrir(self):
+        self._local = threading.local()
+
+    def _consultar(self, sql, parametros=()):
+        return pd.read_sql_query(sql, self._conexao(), params=parametros)
+
+    def opcoes(self):
+        if self._opcoes is None:
+            self._opcoes = {dimensao: [valor for (valor,) in self._conexao().execute(
+                                f"SELECT DISTINCT {dimensao} FROM cubo ORDER BY {dimensao}")]
+                            for dimensao in ["Regiao", "Projeto", "Ano"]}
+        return self._opcoes
+
+    def periodo(self):
+        if self._periodo is None:
+            inicio, fim = self._conexao().execute("SELECT MIN(Data), MAX(Data) FROM cubo").fetchone()
+            self._periodo = (None, None) if inicio is None else (pd.Timestamp(inicio, unit="ns"),
+                                                                  pd.Timestamp(fim, unit="ns"))
+        return self._periodo
+
+    # Os níveis mais grossos que o dia são reagrupados a partir do cubo diário filtrado (que
+    # já veio do banco); o resultado de cada nível também fica guardado. O período é ignorado,
+    # como em consultas.ConsultasPandas.cubo
+    def cubo(self, regioes, projetos, anos, granularidade="dia", inicio=None, fim=None):
+        return self._cubo(*_chave_filtros(regioes, projetos, anos), granularidade)
+
+    def histograma(self, regioes, projetos, anos):
+        return self._histograma(*_chave_filtros(regioes, projetos, anos))
+
+    def _consultar_cubo(self, regioes, projetos, anos, granularidade):
+        if granularidade != "dia":
+            return granularidades.agrupar(self._cubo(regioes, projetos, anos, "dia"), granularidade)
+        filtro, parametros = _filtro(regioes, projetos, anos)
+        inicio = time.perf_counter()
+        df = self._consultar(f"SELECT * FROM cubo WHERE {filtro} ORDER BY Data, Regiao, Projeto", parametros)
+        df["Data"] = pd.to_datetime(df["Data"], unit="ns")
+        for coluna in cubo.colunas_estatisticas():
+            df[coluna] = df[coluna].astype("int64" if coluna in CONTAGENS else "float64")
+        with self._trava:
+            if len(df):
+                self._segundos_por_linha = (time.perf_counter() - inicio) / len(df)
+            self._cubos_guardados[(regioes, projetos, anos)] = True
+            while len(self._cubos_guardados) > RESULTADOS_EM_CACHE:
+                self._cubos_guardados.popitem(last=False)
+        return cubo.finalizar(df)
+
+    # Quanto se espera que o cubo filtrado demore: nada se ele já está guardado; senão as
+    # linhas do cubo diário dos estratos selecionados vezes o tempo por linha da última consulta
+    def segundos_previstos(self, regioes, projetos, anos):
+        chave = _chave_filtros(regioes, projetos, anos)
+        with self._trava:
+            if chave in self._cubos_guardados:
+                self._cubos_guardados.move_to_end(chave)
+                return 0.0
+            segundos_por_linha = self._segundos_por_linha
+        filtro, parametros = _filtro(regioes, projetos, anos)
+        (linhas_cubo,) = self._conexao().execute(f"SELECT COALESCE(SUM(linhas_cubo), 0) FROM estratos WHERE {filtro}",
+                                                 parametros).fetchone()
+        return linhas_cubo * segundos_por_linha
+
+    def _consultar_histograma(self, regioes, projetos, anos):
+        filtro, parametros = _filtro(regioes, projetos, anos)
+        return estatisticas_box.finalizar(self._consultar(f"SELECT * FROM histograma WHERE {filtro}", parametros))
+
+    # Amostra filtrada para a prévia dos cards, já com o tamanho de cada estrato, ou None
+    # quando o banco foi montado sem a prévia
+    def amostra(self, regioes, projetos, anos):
+        if self._com_amostra is None:
+            self._com_amostra = self._conexao().execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'amostra'").fetchone() is not None
+        if not self._com_amostra:
+            return None
+        filtro, parametros = _filtro(regioes, projetos, anos)
+        return amostra.finalizar(self._consultar(f"SELECT * FROM amostra JOIN estratos USING (Regiao, Projeto, Ano) "
+                                                 f"WHERE {filtro}", parametros).drop(columns="linhas_cubo"))
+
+    # Linhas brutas filtradas, na ordem do arquivo
+    def linhas(self, regioes, projetos, anos, colunas=None):
+        filtro, parametros = _filtro(regioes, projetos, anos)
+        selecao = ", ".join(colunas) if colunas else ", ".join(c for c in TIPOS if c != "Ano")
+        df = self._consultar(f"SELECT {selecao} FROM linhas WHERE {filtro} ORDER BY rowid", parametros)
+        if "Data" in df.columns:
+            df["Data"] = pd.to_datetime(df["Data"], unit="ns")
+        for coluna in ["Regiao", "Projeto", "Sexo", "Nome"]:
+            if coluna in df.columns:
+                df[coluna] = df[coluna].astype("category")
+        return df
@@ -0,0 +1,243 @@
+# Benchmark da dashboard sem navegador
+# Gera dados sintéticos de cada tamanho pedido e roda a dashboard com o AppTest do Streamlit
+# por uma sequência fixa de mudanças de filtro, medindo em cada etapa o tempo (total e por
+# etapa interna da dashboard, pelas medições de medicoes.py), a memória (RSS) da própria etapa
+# e o tamanho das figuras enviadas ao navegador. Cada tamanho roda duas vezes,
+# em processos separados: a frio (sem cache em disco) e a quente (com o cache já gravado).
+# O resultado sai em JSON, para comparar execuções e achar regressões.
+# Uso: python benchmark.py [--linhas 100000 1000000 10000000] [--pasta DIR] [--saida arquivo.json]
+# As variáveis DASHBOARD_* (modo de ingestão, backend etc.) valem também para o benchmark
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import gerar_dados
+from cache_colunar import PASTA_CACHE
+
+try:
+    import resource
+except ImportError:
+    # Windows não tem o módulo resource; o pico de memória fica sem medição
+    resource = None
+
+SCRIPT_DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard_trabalho.py")
+
+# Tamanhos padrão dos conjuntos de dados
+LINHAS_PADRAO = [100_000, 1_000_000, 10_000_000]
+
+
+# Pico de memória do processo até agora, em MB (ru_maxrss é em KB no Linux e em bytes no macOS)
+def pico_rss_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+
+
+# Campo de memória de /proc/self/status (VmRSS: atual, VmHWM: pico), em MB; None fora do Linux
+def memoria_status_mb(campo):
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith(campo + ":"):
+                    return round(int(linha.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+# No Linux, escrever 5 em /proc/self/clear_refs zera o pico (VmHWM), que passa a valer só para
+# a etapa seguinte; devolve se conseguiu
+def zerar_pico_rss():
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+# Memória de uma etapa: o RSS no fim, o pico durante a etapa e quanto ele passou do RSS do
+# início. Sem o /proc o pico do processo é cumulativo, então só o quanto ele subiu na etapa
+# diz algo dela
+class MemoriaEtapa:
+    def __init__(self):
+        self.rss_inicio = memoria_status_mb("VmRSS")
+        self.zerado = zerar_pico_rss()
+        self.pico_inicio = pico_rss_mb()
+
+    def resultado(self):
+        if self.zerado:
+            pico = memoria_status_mb("VmHWM")
+            return {"rss_mb": memoria_status_mb("VmRSS"),
+                    "pico_rss_mb": pico,
+                    "pico_rss_acima_inicio_mb": round(pico - self.rss_inicio, 1)}
+        pico = pico_rss_mb()
+        return {"rss_mb": memoria_status_mb("VmRSS"),
+                "pico_rss_mb": None,
+                "pico_rss_acima_inicio_mb": None if pico is None else round(pico - self.pico_inicio, 1)}
+
+
+# Tempo de cada etapa interna (ms) nos resumos que a dashboard acrescentou ao log JSON das
+# medições desde a última leitura; a mesma etapa repetida (uma por seção, por exemplo) é somada
+def ler_etapas_ms(arquivo):
+    etapas_ms = {}
+    for linha in arquivo.read().splitlines():
+        for registro in json.loads(linha)["etapas"]:
+            if registro["segundos"] is not None:
+                etapas_ms[registro["etapa"]] = etapas_ms.get(registro["etapa"], 0) + registro["segundos"] * 1000
+    return {nome: round(ms, 1) for nome, ms in etapas_ms.items()}
+
+
+# Bytes das figuras Plotly que a execução mandaria ao navegador
+def bytes_figuras(at):
+    return sum(len(grafico.proto.spec) for grafico in at.get("plotly_chart"))
+
+
+def _widget(widgets, rotulo):
+    return next(w for w in widgets if rotulo in w.label)
+
+
+def _nada(at):
+    pass
+
+
+# Sequência de interações medida: cada etapa muda algum widget do AppTest antes do rerun
+def etapas():
+    def uma_regiao(at):
+        regioes = _widget(at.sidebar.multiselect, "Região")
+        regioes.set_value(regioes.options[:1])
+
+    def um_ano(at):
+        anos = _widget(at.sidebar.multiselect, "Anos")
+        anos.set_value(anos.options[-1:])
+
+    def todos_filtros(at):
+        for multiselect in at.sidebar.multiselect:
+            multiselect.set_value(multiselect.options)
+
+    def janela_mes(at):
+        _widget(at.selectbox, "Comparação").set_value("mes")
+
+    def resolucao_completa(at):
+        _widget(at.sidebar.checkbox, "Resolução").check()
+
+    # Todo o período, por mês, e depois só o último mês, por dia: os dois devem custar parecido
+    def anos_por_mes(at):
+        _widget(at.sidebar.checkbox, "Resolução").uncheck()
+        _widget(at.sidebar.selectbox, "Granularidade").set_value("mes")
+
+    def ultimo_mes(at):
+        periodo = _widget(at.sidebar.slider, "Período")
+        _, fim = periodo.value
+        periodo.set_value((fim.replace(day=1), fim))
+        _widget(at.sidebar.selectbox, "Granularidade").set_value("dia")
+
+    return [("primeira_execucao", _nada),
+            ("rerun_sem_mudanca", _nada),
+            ("uma_regiao", uma_regiao),
+            ("um_ano", um_ano),
+            ("todos_filtros", todos_filtros),
+            ("janela_mes", janela_mes),
+            ("resolucao_completa", resolucao_completa),
+            ("anos_por_mes", anos_por_mes),
+            ("ultimo_mes", ultimo_mes)]
+
+
+# Roda as etapas neste processo e devolve as medições (chamado pelo processo filho, com as
+# medições de tempo da dashboard ligadas e gravadas no log JSON)
+def executar_cenario(timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(SCRIPT_DASHBOARD, default_timeout=timeout)
+    medicoes = []
+    with open(os.environ["DASHBOARD_MEDICOES_JSON"], "a+", encoding="utf-8") as log:
+        for nome, interagir in etapas():
+            memoria = MemoriaEtapa()
+            inicio = time.perf_counter()
+            interagir(at)
+            at.run()
+            segundos = time.perf_counter() - inicio
+            medicoes.append(dict({"etapa": nome,
+                                  "segundos": round(segundos, 4),
+                                  "etapas_ms": ler_etapas_ms(log)},
+                                 **memoria.resultado(),
+                                 bytes_figuras=bytes_figuras(at),
+                                 figuras=len(at.get("plotly_chart")),
+                                 erros=[str(e.value) for e in at.exception]))
+    return medicoes
+
+
+# Roda um cenário em um processo novo, para que memória e caches de um não afetem o outro
+def rodar_processo(caminho_csv, timeout):
+    with tempfile.TemporaryDirectory() as pasta:
+        ambiente = dict(os.environ,
+                        DASHBOARD_DADOS=os.path.abspath(caminho_csv),
+                        DASHBOARD_INTERVALO_ATUALIZACAO_S="0",
+                        DASHBOARD_MEDICOES="tempo",
+                        DASHBOARD_MEDICOES_JSON=os.path.join(pasta, "medicoes.jsonl"))
+        saida = subprocess.run([sys.executable, os.path.abspath(__file__), "--cenario", "--timeout", str(timeout)],
+                               env=ambiente,
+                               cwd=os.path.dirname(os.path.abspath(caminho_csv)),
+                               capture_output=True,
+                               text=True)
+    if saida.returncode != 0:
+        raise RuntimeError(f"O cenário falhou com {caminho_csv}:\n{saida.stderr[-4000:]}")
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def medir_tamanho(linhas, pasta, timeout):
+    caminho_csv = os.path.join(pasta, f"construcoes_{linhas}.csv")
+    resultado = {"linhas": linhas, "csv": caminho_csv}
+    if not os.path.exists(caminho_csv):
+        inicio = time.perf_counter()
+        gerar_dados.gerar(linhas, caminho_csv)
+        resultado["segundos_geracao"] = round(time.perf_counter() - inicio, 2)
+    resultado["bytes_csv"] = os.path.getsize(caminho_csv)
+
+    # A frio: sem o cache colunar/banco em disco, como na primeira vez que o arquivo é aberto
+    shutil.rmtree(os.path.join(pasta, PASTA_CACHE), ignore_errors=True)
+    resultado["frio"] = rodar_processo(caminho_csv, timeout)
+    resultado["quente"] = rodar_processo(caminho_csv, timeout)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da dashboard com dados sintéticos")
+    parser.add_argument("--linhas", type=int, nargs="+", default=LINHAS_PADRAO)
+    parser.add_argument("--pasta", default="benchmark_dados")
+    parser.add_argument("--saida", help="arquivo JSON do resultado (padrão: só imprime)")
+    parser.add_argument("--timeout", type=float, default=1800, help="tempo máximo de cada execução, em segundos")
+    parser.add_argument("--cenario", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cenario:
+        print(json.dumps(executar_cenario(args.timeout)))
+        return
+
+    os.makedirs(args.pasta, exist_ok=True)
+    resultado = {"data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "python": platform.python_version(),
+                 "plataforma": platform.platform(),
+                 "configuracao": {chave: valor for chave, valor in os.environ.items() if chave.startswith("DASHBOARD_")},
+                 "tamanhos": []}
+    for linhas in args.linhas:
+        print(f"Medindo {linhas} linhas...", file=sys.stderr)
+        resultado["tamanhos"].append(medir_tamanho(linhas, args.pasta, args.timeout))
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
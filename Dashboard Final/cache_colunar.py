@@ -0,0 +1,254 @@
+# Cache colunar em disco para o relatório de construções
+# O CSV é lido e convertido uma única vez para o formato Arrow (Feather v2, sem compressão);
+# nas próximas inicializações o arquivo é apenas mapeado em memória, sem parse nenhum.
+# Quando o CSV só ganhou linhas no final, apenas o trecho novo é lido e juntado ao cache
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from pandas.api.types import union_categoricals
+
+import trechos_csv
+
+# Colunas usadas pela dashboard, na ordem do CSV
+COLUNAS = ["Data",
+           "Nome",
+           "Sexo",
+           "Regiao",
+           "Projeto",
+           "Funcionarios",
+           "Tempo_conclusao_dias",
+           "Custo_Reais"]
+
+# Colunas de texto com poucos valores distintos, guardadas como categóricas
+COLUNAS_CATEGORICAS = ["Regiao", "Projeto", "Sexo", "Nome"]
+
+# Pasta (ao lado do CSV) onde o cache é gravado
+PASTA_CACHE = ".cache_dados"
+
+# Versão do formato do cache: mudar aqui invalida todos os caches antigos
+VERSAO_FORMATO = 5
+
+
+# Converte as colunas para tipos compactos: texto em categoria e inteiros no menor tipo possível
+def otimizar_tipos(df):
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype("category")
+    for coluna in ["Funcionarios", "Tempo_conclusao_dias"]:
+        if coluna in df.columns:
+            df[coluna] = pd.to_numeric(df[coluna], downcast="integer")
+    # Custo_Reais continua em float64 para que as somas não percam precisão
+    return df
+
+
+# Lê o CSV, converte a Data e remove as linhas sem data válida (mesmo tratamento de sempre)
+# "fonte" é um trecho já aberto do arquivo; sem ela o arquivo inteiro é lido
+def ler_csv(caminho, fonte=None):
+    df = pd.read_csv(caminho if fonte is None else fonte, usecols=COLUNAS)
+    df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
+    df.dropna(subset=["Data"], inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    return otimizar_tipos(df)
+
+
+# Junta linhas novas ao final de um DataFrame já carregado, unindo as categorias
+def juntar_linhas(antigo, novo):
+    if novo.empty:
+        return antigo
+    if antigo.empty:
+        return novo
+    juntos = {}
+    for coluna in antigo.columns:
+        if isinstance(antigo[coluna].dtype, pd.CategoricalDtype):
+            juntos[coluna] = union_categoricals([antigo[coluna], novo[coluna].astype("category")],
+                                                ignore_order=True)
+        else:
+            juntos[coluna] = pd.concat([antigo[coluna], novo[coluna]], ignore_index=True)
+    return otimizar_tipos(pd.DataFrame(juntos))
+
+
+# Calcula o hash do arquivo em blocos, sem carregá-lo inteiro na memória
+def calcular_hash(caminho, tamanho_bloco=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+# Identifica a versão atual do CSV pelo tamanho e data de modificação (e opcionalmente pelo hash)
+def impressao_digital(caminho, usar_hash=False):
+    info = os.stat(caminho)
+    digital = {"versao_formato": VERSAO_FORMATO,
+               "tamanho": info.st_size,
+               "mtime_ns": info.st_mtime_ns}
+    if usar_hash:
+        digital["hash"] = calcular_hash(caminho)
+    return digital
+
+
+# Caminhos do arquivo Arrow e dos metadados correspondentes a um CSV
+# (o sufixo separa caches diferentes do mesmo CSV, como linhas e agregados)
+def caminhos_cache(caminho_csv, sufixo=""):
+    pasta = os.path.join(os.path.dirname(os.path.abspath(caminho_csv)), PASTA_CACHE)
+    base = os.path.splitext(os.path.basename(caminho_csv))[0]
+    if sufixo:
+        base = f"{base}.{sufixo}"
+    return os.path.join(pasta, base + ".arrow"), os.path.join(pasta, base + ".json")
+
+
+def _ler_metadados(caminho_meta):
+    try:
+        with open(caminho_meta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Grava o arquivo em um temporário e troca de nome no final, para nunca deixar um cache pela metade
+def _gravar_atomico(caminho, escrever):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+# Grava o DataFrame no formato Arrow junto com a impressão digital do CSV de origem
+# e a posição até onde o CSV foi lido (usada pela carga incremental)
+def gravar_cache(df, caminho_csv, digital, sufixo="", lido_ate=None):
+    caminho_arrow, caminho_meta = caminhos_cache(caminho_csv, sufixo)
+    os.makedirs(os.path.dirname(caminho_arrow), exist_ok=True)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    # Sem compressão e em um único bloco (record batch), para que as colunas possam ser
+    # usadas direto do arquivo mapeado em memória, sem cópia
+    _gravar_atomico(caminho_arrow,
+                    lambda destino: feather.write_feather(tabela,
+                                                          destino,
+                                                          compression="uncompressed",
+                                                          chunksize=max(1, tabela.num_rows)))
+
+    def escrever_meta(destino):
+        with open(destino, "w", encoding="utf-8") as f:
+            json.dump(dict(digital,
+                           linhas=len(df),
+                           lido_ate=lido_ate,
+                           assinatura=trechos_csv.assinatura(caminho_csv, lido_ate) if lido_ate else None), f)
+    _gravar_atomico(caminho_meta, escrever_meta)
+
+
+# Abre o cache por memory-map sem copiar os dados: as colunas numéricas, a Data e os códigos
+# das categorias viram arrays NumPy que apontam direto para o arquivo. As páginas ficam no cache
+# do sistema operacional, compartilhadas entre as sessões e entre os processos que abrem o
+# mesmo arquivo; os arrays são somente leitura
+def ler_cache(caminho_arrow):
+    tabela = feather.read_table(caminho_arrow, memory_map=True)
+    if any(coluna.num_chunks != 1 for coluna in tabela.columns):
+        # Arquivo em vários blocos: as colunas precisam ser emendadas, então há cópia
+        return tabela.to_pandas()
+    colunas = {nome: _coluna_sem_copia(coluna.chunk(0)) for nome, coluna in zip(tabela.column_names, tabela.columns)}
+    # copy=False também evita que colunas do mesmo tipo sejam juntadas em um bloco novo
+    return pd.DataFrame(colunas, copy=False)
+
+
+def _coluna_sem_copia(array):
+    try:
+        if pa.types.is_dictionary(array.type):
+            return pd.Categorical.from_codes(array.indices.to_numpy(zero_copy_only=True),
+                                             categories=array.dictionary.to_pandas(),
+                                             ordered=array.type.ordered,
+                                             validate=False)
+        return array.to_numpy(zero_copy_only=True)
+    except pa.ArrowInvalid:
+        # Colunas com valores nulos não têm representação direta em NumPy: são convertidas com cópia
+        return array.to_pandas()
+
+
+# Retorna o DataFrame do CSV, usando o cache colunar quando ele ainda corresponde ao arquivo
+# "construir(caminho, fonte)" gera o DataFrame quando o cache não serve, e
+# "anexar(caminho, antigo, fonte)" junta a ele as linhas de um trecho novo do CSV
+def carregar_com_cache(caminho_csv, usar_hash=False, construir=ler_csv, sufixo="", anexar=None):
+    anexar_varios = None
+    if anexar is not None:
+        anexar_varios = lambda caminho, antigos, fonte: (anexar(caminho, antigos[0], fonte),)
+    return carregar_varios_com_cache(caminho_csv,
+                                     lambda caminho, fonte: (construir(caminho, fonte),),
+                                     [sufixo],
+                                     usar_hash,
+                                     anexar_varios)[0]
+
+
+# Igual a carregar_com_cache, para vários DataFrames gerados de uma vez a partir do mesmo CSV
+# (por exemplo, em uma única leitura em blocos); "construir" devolve um DataFrame por sufixo
+def carregar_varios_com_cache(caminho_csv, construir, sufixos, usar_hash=False, anexar=None):
+    digital = impressao_digital(caminho_csv, usar_hash)
+    caminhos = [caminhos_cache(caminho_csv, sufixo) for sufixo in sufixos]
+    metas = [_ler_metadados(caminho_meta) for _, caminho_meta in caminhos]
+    # Só as linhas completas entram; uma linha ainda sendo gravada fica para a próxima carga
+    lido_ate = trechos_csv.fim_ultima_linha(caminho_csv, digital["tamanho"])
+
+    try:
+        if all(_cache_valido(caminho_arrow, meta, digital) for (caminho_arrow, _), meta in zip(caminhos, metas)):
+            return [ler_cache(caminho_arrow) for caminho_arrow, _ in caminhos]
+
+        # O CSV só cresceu desde a última carga: lê apenas o trecho novo
+        inicio = _inicio_incremental(caminho_csv, caminhos, metas, digital) if anexar else None
+        if inicio is not None:
+            antigos = [ler_cache(caminho_arrow) for caminho_arrow, _ in caminhos]
+            with trechos_csv.abrir_trecho(caminho_csv, inicio, lido_ate) as fonte:
+                dfs = list(anexar(caminho_csv, antigos, fonte))
+            return _gravar_todos(dfs, caminho_csv, digital, sufixos, lido_ate)
+    except (OSError, pa.ArrowInvalid):
+        # Cache corrompido: segue para a reconstrução
+        pass
+
+    with trechos_csv.abrir_trecho(caminho_csv, 0, lido_ate) as fonte:
+        dfs = list(construir(caminho_csv, fonte))
+    return _gravar_todos(dfs, caminho_csv, digital, sufixos, lido_ate)
+
+
+# Grava os caches e devolve os DataFrames relidos do disco, para que o processo use a cópia
+# mapeada (compartilhada) em vez da que acabou de montar
+def _gravar_todos(dfs, caminho_csv, digital, sufixos, lido_ate):
+    try:
+        for df, sufixo in zip(dfs, sufixos):
+            gravar_cache(df, caminho_csv, digital, sufixo, lido_ate)
+        return [ler_cache(caminhos_cache(caminho_csv, sufixo)[0]) for sufixo in sufixos]
+    except (OSError, pa.ArrowInvalid):
+        # Sem permissão de escrita na pasta: a dashboard funciona normalmente sem o cache
+        return dfs
+
+
+def _cache_valido(caminho_arrow, meta, digital):
+    if meta is None or not os.path.exists(caminho_arrow):
+        return False
+    return all(meta.get(chave) == valor for chave, valor in digital.items())
+
+
+# Decide se dá para ler só o final do CSV: todos os caches precisam ter parado no mesmo ponto,
+# no mesmo formato, e o conteúdo até esse ponto não pode ter mudado (senão devolve None)
+def _inicio_incremental(caminho_csv, caminhos, metas, digital):
+    if any(meta is None or not os.path.exists(caminho_arrow) for (caminho_arrow, _), meta in zip(caminhos, metas)):
+        return None
+    pontos = {(meta.get("lido_ate"), meta.get("assinatura"), meta.get("versao_formato")) for meta in metas}
+    if len(pontos) != 1:
+        return None
+    return inicio_incremental(caminho_csv, metas[0], digital)
+
+
+# Posição a partir da qual basta ler o CSV, segundo os metadados gravados na última carga,
+# ou None quando o arquivo mudou de outro jeito (truncado, reescrito) ou o formato é antigo
+def inicio_incremental(caminho_csv, meta, digital):
+    lido_ate = meta.get("lido_ate")
+    if not lido_ate or meta.get("versao_formato") != VERSAO_FORMATO or digital["tamanho"] < lido_ate:
+        return None
+    if trechos_csv.assinatura(caminho_csv, lido_ate) != meta.get("assinatura"):
+        return None
+    return lido_ate
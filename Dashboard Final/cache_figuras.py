@@ -0,0 +1,122 @@
+# Cache de figuras compartilhado entre as sessões
+# As figuras ficam guardadas pela combinação (versão dos dados, filtros, parâmetros do gráfico);
+# voltar a um filtro já visto, por qualquer usuário, reaproveita a figura pronta.
+# O cache tem limite de memória e descarta primeiro as figuras usadas há mais tempo (LRU)
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+
+# Gera uma chave canônica para o estado: listas de filtros são ordenadas, já que a ordem
+# em que os valores foram escolhidos no multiselect não muda o resultado
+def chave_estado(*partes):
+    normalizadas = [sorted(map(str, parte)) if isinstance(parte, (list, tuple, set)) else parte
+                    for parte in partes]
+    texto = json.dumps(normalizadas, sort_keys=True, default=str)
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# Tamanho aproximado de um item em memória, medido pelo JSON que vai para o navegador
+def tamanho_item(item):
+    if hasattr(item, "to_plotly_json"):
+        return len(pio.to_json(item, validate=False))
+    if isinstance(item, (bytes, str)):
+        return len(item)
+    return 0
+
+
+def _construir_e_medir(construir):
+    item = construir()
+    return item, tamanho_item(item)
+
+
+class CacheFiguras:
+    def __init__(self, max_bytes, max_itens):
+        self.max_bytes = max_bytes
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    # Devolve o item guardado na chave ou o constrói (fora da trava) e guarda.
+    # Os itens são compartilhados entre sessões e não devem ser alterados depois de prontos
+    def obter(self, chave, construir):
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave][0]
+            self.falhas += 1
+
+        item = construir()
+        self.guardar(chave, item)
+        return item
+
+    # Como obter, para vários itens de uma vez ({chave: construir}). Os que faltam são construídos
+    # ao mesmo tempo pelo executor, que também mede o tamanho de cada um (a serialização em JSON
+    # é parte do custo); sem executor, ou com um item só, são construídos em sequência aqui.
+    # "preparar", quando informado, recebe as chaves que faltam e roda nesta thread antes das
+    # construções (para ler o que elas compartilham uma vez só, sem disputa entre as threads)
+    def obter_varios(self, construtores, executor=None, preparar=None):
+        itens = {}
+        faltando = {}
+        with self._trava:
+            for chave, construir in construtores.items():
+                if chave in self._itens:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    itens[chave] = self._itens[chave][0]
+                else:
+                    self.falhas += 1
+                    faltando[chave] = construir
+
+        if preparar is not None and faltando:
+            preparar(list(faltando))
+        if executor is not None and len(faltando) > 1:
+            futuros = {chave: executor.submit(_construir_e_medir, construir) for chave, construir in faltando.items()}
+            prontos = {chave: futuro.result() for chave, futuro in futuros.items()}
+        else:
+            prontos = {chave: _construir_e_medir(construir) for chave, construir in faltando.items()}
+        for chave, (item, tamanho) in prontos.items():
+            self.guardar(chave, item, tamanho)
+            itens[chave] = item
+        return itens
+
+    def guardar(self, chave, item, tamanho=None):
+        if tamanho is None:
+            tamanho = tamanho_item(item)
+        if tamanho > self.max_bytes:
+            # Um item maior que o cache inteiro só expulsaria todos os outros
+            return
+        with self._trava:
+            if chave in self._itens:
+                self.bytes -= self._itens.pop(chave)[1]
+            self._itens[chave] = (item, tamanho)
+            self.bytes += tamanho
+            # Descarta os itens usados há mais tempo até voltar aos limites
+            while self._itens and (self.bytes > self.max_bytes or len(self._itens) > self.max_itens):
+                _, (_, tamanho_antigo) = self._itens.popitem(last=False)
+                self.bytes -= tamanho_antigo
+                self.descartes += 1
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self.bytes = 0
+
+    def estatisticas(self):
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {"itens": len(self._itens),
+                    "bytes": self.bytes,
+                    "acertos": self.acertos,
+                    "falhas": self.falhas,
+                    "descartes": self.descartes,
+                    "taxa_acerto": self.acertos / consultas if consultas else 0.0}
@@ -0,0 +1,98 @@
+# Carga dos dados da dashboard
+# Monta as consultas (pandas em memória ou em streaming, SQLite, ou pasta particionada) conforme
+# a configuração, passando pelo cache colunar em disco. Não depende do Streamlit: a dashboard
+# guarda o resultado no atualizador, e o exportador de relatórios carrega do mesmo jeito
+
+import os
+
+import banco_sqlite
+import cubo
+import estatisticas_box
+import medicoes
+import particoes
+from banco_sqlite import ConsultasSQLite
+from cache_colunar import (carregar_com_cache, carregar_varios_com_cache, impressao_digital, juntar_linhas,
+                           ler_csv)
+from configuracao import (BACKEND, CAMINHO_DADOS, FRACAO_PREVIA, MEDICOES, MEMORIA_MAX_MB, MODO_INCREMENTAL,
+                          MODO_INGESTAO, THREADS_PARTICOES)
+from consultas import ConsultasPandas
+from ingestao import agregar_csv_em_blocos, anexar_resumos
+from particoes import ConsultasParticionadas
+
+# Prévia dos cards por amostra: só onde o cubo exato pode demorar (o banco SQLite e a pasta
+# particionada, com partições ainda não carregadas); no pandas o cubo já está em memória
+PREVIA = FRACAO_PREVIA > 0 and (BACKEND == "sqlite" or os.path.isdir(CAMINHO_DADOS))
+
+
+# Linhas acrescentadas ao final do .csv são lidas sozinhas e juntadas ao que já estava carregado
+def anexar_trecho_linhas(caminho, antigo, fonte):
+    return juntar_linhas(antigo, ler_csv(caminho, fonte))
+
+
+def anexar_trecho_resumos(caminho, antigos, fonte):
+    return anexar_resumos(antigos, agregar_csv_em_blocos(caminho, MEMORIA_MAX_MB, fonte))
+
+
+# Carrega o .csv passando pelo cache colunar em disco: o parse completo (colunas, conversão da
+# Data e remoção de datas inválidas) só acontece quando o arquivo muda; fora isso o cache é
+# mapeado em memória. Se o arquivo apenas ganhou linhas no final, só o trecho novo é lido
+@medicoes.medido("leitura_dados")
+def carregar_dados(caminho_csv):
+    return carregar_com_cache(caminho_csv, anexar=anexar_trecho_linhas if MODO_INCREMENTAL else None)
+
+
+# Monta os resumos usados pelos cards e gráficos: o cubo (Regiao, Projeto, Ano, Data) com soma,
+# contagem, mínimo, máximo e soma dos quadrados, e o histograma de funcionários do boxplot.
+# No modo streaming (df None) os dois saem direto da leitura do .csv em blocos de tamanho
+# limitado. Também ficam salvos no cache colunar em disco
+@medicoes.medido("resumos")
+def carregar_resumos(caminho_csv, df):
+    if df is None:
+        construir = lambda caminho, fonte: agregar_csv_em_blocos(caminho, MEMORIA_MAX_MB, fonte)
+    else:
+        construir = lambda caminho, fonte: (cubo.montar(df), estatisticas_box.montar(df))
+    return carregar_varios_com_cache(caminho_csv,
+                                     construir,
+                                     ["cubo", "histograma"],
+                                     anexar=anexar_trecho_resumos if MODO_INCREMENTAL else None)
+
+
+# No modo streaming só existem os resumos; as linhas brutas não são carregadas
+def carregar_consultas_pandas(caminho_csv):
+    df = None if MODO_INGESTAO == "streaming" else carregar_dados(caminho_csv)
+    return ConsultasPandas(df, *carregar_resumos(caminho_csv, df))
+
+
+# Consultas usadas pela dashboard. Com uma pasta particionada por ano e mês, só as partições que
+# os filtros pedirem são carregadas; no backend SQLite os filtros e agregações rodam no banco;
+# no pandas os dados ficam em memória
+def montar_consultas():
+    if os.path.isdir(CAMINHO_DADOS):
+        if BACKEND == "sqlite":
+            raise ValueError("O backend SQLite lê um único CSV; use DASHBOARD_BACKEND=pandas com pastas particionadas")
+        return ConsultasParticionadas(CAMINHO_DADOS, carregar_consultas_pandas, THREADS_PARTICOES,
+                                      FRACAO_PREVIA if PREVIA else 0)
+    if BACKEND == "sqlite":
+        with medicoes.etapa("banco_sqlite"):
+            caminho_banco = banco_sqlite.preparar(CAMINHO_DADOS, MEMORIA_MAX_MB, MODO_INCREMENTAL,
+                                                  FRACAO_PREVIA if PREVIA else 0)
+        return ConsultasSQLite(caminho_banco)
+    return carregar_consultas_pandas(CAMINHO_DADOS)
+
+
+# A carga pode rodar na thread de atualização, fora de qualquer execução do script, então tem
+# o seu próprio medidor; o resumo dela fica nos totais para o painel
+def montar_dados(versao_arquivo, totais_medicoes):
+    medidor_carga = medicoes.criar(MEDICOES)
+    with medicoes.usando(medidor_carga), medicoes.etapa("carga_dados"):
+        dados = montar_consultas()
+    if medidor_carga is not None:
+        totais_medicoes.registrar(medidor_carga, "carga")
+    return dados
+
+
+# Versão do arquivo (tamanho e data de modificação) ou de cada partição da pasta
+def versao_origem():
+    if os.path.isdir(CAMINHO_DADOS):
+        return particoes.impressao_digital(CAMINHO_DADOS)
+    return impressao_digital(CAMINHO_DADOS)
@@ -0,0 +1,86 @@
+# Configurações da dashboard
+# Todos os valores podem ser trocados por variáveis de ambiente, sem mexer no código
+
+import os
+
+
+def _ler_int(nome, padrao):
+    try:
+        return int(os.environ.get(nome, padrao))
+    except ValueError:
+        return padrao
+
+
+def _ler_float(nome, padrao):
+    try:
+        return float(os.environ.get(nome, padrao))
+    except ValueError:
+        return padrao
+
+
+# Arquivo de dados lido pela dashboard, ou uma pasta com um CSV por mês (<pasta>/<ano>/<mes>.csv)
+CAMINHO_DADOS = os.environ.get("DASHBOARD_DADOS", "relatorio_construcoes.csv")
+
+# Quantas partições da pasta são lidas ao mesmo tempo
+THREADS_PARTICOES = _ler_int("DASHBOARD_THREADS_PARTICOES", min(8, os.cpu_count() or 1))
+
+# "memoria" carrega todas as linhas em um DataFrame;
+# "streaming" lê o CSV em blocos e guarda apenas os agregados (para arquivos maiores que a RAM)
+MODO_INGESTAO = os.environ.get("DASHBOARD_INGESTAO", "memoria")
+
+# Onde os filtros e agregações rodam: "pandas" (em memória, o padrão) ou "sqlite", que carrega
+# o CSV em um banco SQLite indexado em disco e faz os filtros e somas com SQL
+BACKEND = os.environ.get("DASHBOARD_BACKEND", "pandas")
+
+# Quando o CSV só ganhou linhas no final, lê apenas o trecho novo em vez de recarregar tudo
+# (DASHBOARD_INCREMENTAL=0 desliga e volta a reler o arquivo inteiro a cada mudança)
+MODO_INCREMENTAL = os.environ.get("DASHBOARD_INCREMENTAL", "1") != "0"
+
+# De quantos em quantos segundos uma thread verifica se o CSV mudou e monta a versão nova em
+# segundo plano, enquanto a anterior continua sendo servida (0 desliga a verificação)
+INTERVALO_ATUALIZACAO_S = _ler_int("DASHBOARD_INTERVALO_ATUALIZACAO_S", 60)
+
+# Prévia rápida dos cards no banco SQLite e na pasta particionada: fração das linhas (ex.: 0.01)
+# guardada numa amostra estratificada por (Regiao, Projeto, Ano). Depois de uma mudança de filtro,
+# os cards aparecem primeiro com valores aproximados e intervalo de confiança, e os exatos tomam
+# o lugar deles em seguida (0 desliga)
+FRACAO_PREVIA = _ler_float("DASHBOARD_FRACAO_PREVIA", 0)
+
+# A prévia só aparece quando os cards exatos devem demorar mais que isto (ms)
+ORCAMENTO_PREVIA_MS = _ler_int("DASHBOARD_ORCAMENTO_PREVIA_MS", 300)
+
+# Limite aproximado de memória (em MB) usado por cada bloco no modo streaming
+MEMORIA_MAX_MB = _ler_int("DASHBOARD_MEMORIA_MAX_MB", 256)
+
+# Janela padrão usada no crescimento dos cards: "data", "mes" ou "ano"
+JANELA_CRESCIMENTO = os.environ.get("DASHBOARD_JANELA_CRESCIMENTO", "data")
+
+# Largura aproximada (em pixels) de cada sparkline e do gráfico de tendência; define quantos
+# pontos vale a pena enviar ao navegador, já que não dá para desenhar mais de um por pixel
+LARGURA_SPARKLINE_PX = _ler_int("DASHBOARD_LARGURA_SPARKLINE_PX", 300)
+LARGURA_GRAFICO_PX = _ler_int("DASHBOARD_LARGURA_GRAFICO_PX", 1200)
+
+# Séries com mais pontos que este limite são desenhadas com WebGL (Scattergl) em vez de SVG (0 desliga)
+LIMITE_WEBGL = _ler_int("DASHBOARD_LIMITE_WEBGL", 1000)
+
+# Envia os números e datas das figuras como arrays binários (base64) em vez de texto no JSON
+# (DASHBOARD_ENVIO_BINARIO=0 volta ao JSON do Plotly)
+ENVIO_BINARIO = os.environ.get("DASHBOARD_ENVIO_BINARIO", "1") != "0"
+
+# Quantas figuras são construídas ao mesmo tempo, cada uma numa thread (0 ou 1: uma depois da outra)
+THREADS_FIGURAS = _ler_int("DASHBOARD_THREADS_FIGURAS", min(4, os.cpu_count() or 1))
+
+# Limites do cache de figuras compartilhado entre as sessões (memória em MB e quantidade)
+CACHE_FIGURAS_MAX_MB = _ler_int("DASHBOARD_CACHE_FIGURAS_MAX_MB", 256)
+CACHE_FIGURAS_MAX_ITENS = _ler_int("DASHBOARD_CACHE_FIGURAS_MAX_ITENS", 512)
+
+# Medições de desempenho por etapa: "desligado" (padrão), "tempo" (tempo e linhas) ou "memoria"
+# (também a memória alocada, deixando a dashboard mais lenta). Ligadas, aparecem em um painel na
+# barra lateral e, se os caminhos forem dados, num log JSON e num arquivo no formato do Prometheus
+MEDICOES = os.environ.get("DASHBOARD_MEDICOES", "desligado")
+ARQUIVO_MEDICOES_JSON = os.environ.get("DASHBOARD_MEDICOES_JSON", "")
+ARQUIVO_MEDICOES_PROMETHEUS = os.environ.get("DASHBOARD_MEDICOES_PROMETHEUS", "")
+
+# Orçamento de partida: tempo máximo, em ms, do início do script até os cards estarem na página.
+# Com as medições ligadas o painel avisa quando ele é estourado; medir_partida.py confere a frio
+ORCAMENTO_PARTIDA_MS = _ler_int("DASHBOARD_ORCAMENTO_PARTIDA_MS", 3000)
@@ -0,0 +1,58 @@
+# Consultas da dashboard sobre os dados carregados em pandas
+# A dashboard só conversa com os dados por esta interface (opções dos filtros, período dos dados,
+# cubo em cada granularidade, histograma, linhas brutas e amostra filtrados, e quanto se espera que o cubo filtrado demore), que também é implementada pelo
+# backend SQLite (banco_sqlite.py) e pela pasta particionada (particoes.py)
+
+import granularidades
+import indice_filtros
+
+
+class ConsultasPandas:
+    # "df" são as linhas brutas (None no modo streaming, em que só existem os resumos)
+    def __init__(self, df, df_cubo, df_hist):
+        self.df = df
+        self.df_cubo = df_cubo
+        self.df_hist = df_hist
+        # Os índices são montados junto com os dados, para nunca ficarem dessincronizados
+        self.indice_df = None if df is None else indice_filtros.construir(df)
+        self.indice_cubo = indice_filtros.construir(df_cubo)
+        # Cubo agregado por semana, mês e trimestre, cada nível com o seu índice
+        self.niveis = granularidades.montar(df_cubo)
+        self.indices_niveis = {granularidade: self.indice_cubo if granularidade == "dia"
+                               else indice_filtros.construir(nivel)
+                               for granularidade, nivel in self.niveis.items()}
+        self.indice_hist = indice_filtros.construir(df_hist)
+
+    # Opções dos filtros, já ordenadas e calculadas uma única vez na carga
+    def opcoes(self):
+        return self.indice_cubo["opcoes"]
+
+    # Primeira e última data dos dados (None, None sem dados)
+    def periodo(self):
+        if not len(self.df_cubo):
+            return None, None
+        return self.df_cubo["Data"].iloc[0], self.df_cubo["Data"].iloc[-1]
+
+    # Cubo filtrado no nível pedido ("dia", "semana", "mes" ou "trimestre"), ordenado pela Data.
+    # O período [inicio, fim] só serve para a pasta particionada não carregar partições fora
+    # dele; o recorte nas datas fica com granularidades.recortar
+    def cubo(self, regioes, projetos, anos, granularidade="dia", inicio=None, fim=None):
+        return indice_filtros.filtrar(self.niveis[granularidade], self.indices_niveis[granularidade],
+                                      regioes, projetos, anos)
+
+    def histograma(self, regioes, projetos, anos):
+        return indice_filtros.filtrar(self.df_hist, self.indice_hist, regioes, projetos, anos)
+
+    # O cubo já está em memória e indexado: o filtro exato leva milissegundos, então não há
+    # prévia por amostra (que nunca chegaria antes dos cards exatos)
+    def segundos_previstos(self, regioes, projetos, anos):
+        return 0.0
+
+    def amostra(self, regioes, projetos, anos):
+        return None
+
+    # Linhas brutas filtradas (só as colunas pedidas), ou None quando não há linhas carregadas
+    def linhas(self, regioes, projetos, anos, colunas=None):
+        if self.df is None:
+            return None
+        return indice_filtros.filtrar(self.df, self.indice_df, regioes, projetos, anos, colunas=colunas)
@@ -0,0 +1,53 @@
+# Crescimento percentual dos cards de métricas
+# Todas as métricas são calculadas de uma vez sobre um resumo por período do cubo filtrado,
+# sem reordenar nem mascarar as linhas brutas
+
+import cubo
+
+# Janelas de comparação disponíveis: rótulo exibido na barra lateral
+JANELAS = {"data": "Última data x anterior",
+           "mes": "Último mês x anterior",
+           "ano": "Último ano x anterior"}
+
+# Nível do cubo (granularidades.py) lido por cada janela: o mais grosso que ainda separa os
+# períodos comparados, então a conta passa por menos grupos sem mudar o resultado
+NIVEIS = {"data": "dia",
+          "mes": "mes",
+          "ano": "trimestre"}
+
+
+# Chave de período de cada grupo do cubo para a janela escolhida
+def _periodo(df_cubo, janela):
+    if janela == "data":
+        return df_cubo["Data"]
+    if janela == "mes":
+        return df_cubo["Data"].dt.to_period("M")
+    if janela == "ano":
+        return df_cubo["Ano"]
+    raise ValueError(f"Janela de crescimento desconhecida: {janela!r}")
+
+
+# Soma todas as métricas (e suas contagens) por período, em uma única passada pelo cubo
+def resumo_por_periodo(df_cubo, janela="data"):
+    colunas = cubo.METRICAS + [cubo.coluna_qtd(m) for m in cubo.METRICAS]
+    return df_cubo.groupby(_periodo(df_cubo, janela), sort=True)[colunas].sum()
+
+
+# Calcula o crescimento entre os dois períodos mais recentes para todas as métricas dos cards.
+# Devolve um dicionário com a variação (em %) da soma de cada métrica e do custo médio
+def calcular_crescimentos(df_cubo, janela="data"):
+    chaves = cubo.METRICAS + ["Custo_medio"]
+    resumo = resumo_por_periodo(df_cubo, janela)
+    # Se houver menos de dois períodos, retorna 0 para evitar erro
+    if len(resumo) < 2:
+        return dict.fromkeys(chaves, 0.0)
+
+    ultimos = resumo.iloc[-2:]
+    valores = ultimos[cubo.METRICAS].copy()
+    valores["Custo_medio"] = ultimos["Custo_Reais"] / ultimos[cubo.coluna_qtd("Custo_Reais")]
+    anterior, ultimo = valores.iloc[0], valores.iloc[1]
+
+    variacao = (ultimo - anterior) / anterior * 100
+    # Período anterior zerado (ou sem valores) não tem base de comparação
+    variacao = variacao.where((anterior != 0) & anterior.notna(), 0.0).fillna(0.0)
+    return {chave: float(variacao[chave]) for chave in chaves}
@@ -0,0 +1,106 @@
+# Cubo de agregados do relatório de construções
+# Cada linha guarda, para uma combinação (Regiao, Projeto, Ano, Data), a quantidade de linhas
+# e a soma, a contagem, o mínimo, o máximo e a soma dos quadrados das métricas. A coluna da soma mantém o nome
+# original da métrica, então gráficos que somam valores (barras, pizza, sparklines) funcionam
+# igual sobre o cubo. Como o número de grupos é muito menor que o de linhas, filtros e cards
+# calculados aqui custam proporcional ao número de grupos
+
+import pandas as pd
+
+# Colunas que identificam cada grupo
+DIMENSOES = ["Regiao", "Projeto", "Ano", "Data"]
+
+# Métricas numéricas agregadas
+METRICAS = ["Custo_Reais", "Funcionarios", "Tempo_conclusao_dias"]
+
+# Quantidade de linhas de cada grupo (inclusive as que têm alguma métrica vazia)
+LINHAS = "Linhas"
+
+
+def coluna_qtd(metrica):
+    return f"{metrica}_qtd"
+
+
+def coluna_min(metrica):
+    return f"{metrica}_min"
+
+
+def coluna_max(metrica):
+    return f"{metrica}_max"
+
+
+def coluna_quad(metrica):
+    return f"{metrica}_quad"
+
+
+# Como cada coluna do cubo é combinada quando grupos iguais se juntam
+def _regras_combinacao():
+    regras = {LINHAS: "sum"}
+    for metrica in METRICAS:
+        regras[metrica] = "sum"
+        regras[coluna_qtd(metrica)] = "sum"
+        regras[coluna_min(metrica)] = "min"
+        regras[coluna_max(metrica)] = "max"
+        regras[coluna_quad(metrica)] = "sum"
+    return regras
+
+
+def colunas_estatisticas():
+    return list(_regras_combinacao())
+
+
+# Agrega um DataFrame de linhas brutas (ou um bloco dele) por DIMENSOES
+def agregar(df):
+    base = df[["Regiao", "Projeto", "Data"] + METRICAS].copy()
+    base["Ano"] = base["Data"].dt.year.astype("int16")
+    for metrica in METRICAS:
+        valores = base[metrica].astype("float64")
+        base[metrica] = valores
+        base[coluna_quad(metrica)] = valores * valores
+    grupos = base.groupby(DIMENSOES, observed=True, sort=False)
+
+    somas = grupos[METRICAS + [coluna_quad(m) for m in METRICAS]].sum()
+    contagens = grupos[METRICAS].count().rename(columns=coluna_qtd)
+    minimos = grupos[METRICAS].min().rename(columns=coluna_min)
+    maximos = grupos[METRICAS].max().rename(columns=coluna_max)
+    linhas = grupos.size().rename(LINHAS)
+    return pd.concat([linhas, somas, contagens, minimos, maximos], axis=1)[colunas_estatisticas()].reset_index()
+
+
+# Junta cubos parciais (de blocos diferentes) em um único cubo
+def combinar(partes):
+    partes = [p for p in partes if len(p)]
+    if not partes:
+        # Vazio, mas com a Data como data, para os filtros e agrupamentos por período
+        return pd.DataFrame(columns=DIMENSOES + colunas_estatisticas()).astype({"Data": "datetime64[ns]"})
+    juntos = pd.concat(partes, ignore_index=True)
+    # Os blocos podem ter categorias diferentes; voltam a ser texto antes de reagrupar
+    for dimensao in ["Regiao", "Projeto"]:
+        juntos[dimensao] = juntos[dimensao].astype(str)
+    return juntos.groupby(DIMENSOES, sort=False).agg(_regras_combinacao()).reset_index()
+
+
+# Deixa as dimensões de texto como categóricas e ordena pela Data
+def finalizar(cubo):
+    cubo = cubo.sort_values("Data", kind="stable").reset_index(drop=True)
+    for dimensao in ["Regiao", "Projeto"]:
+        cubo[dimensao] = cubo[dimensao].astype("category")
+    cubo["Ano"] = cubo["Ano"].astype("int16")
+    return cubo
+
+
+# Monta o cubo completo a partir de um DataFrame de linhas brutas
+def montar(df):
+    return finalizar(agregar(df))
+
+
+# Média ponderada de uma métrica sobre um conjunto de grupos do cubo
+def media(cubo, metrica):
+    qtd = cubo[coluna_qtd(metrica)].sum()
+    return float("nan") if qtd == 0 else cubo[metrica].sum() / qtd
+
+
+# Média de uma métrica por valor de uma dimensão (ex.: custo médio por Projeto)
+def media_por(cubo, dimensao, metrica):
+    grupos = cubo.groupby(dimensao, observed=True)[[metrica, coluna_qtd(metrica)]].sum()
+    return (grupos[metrica] / grupos[coluna_qtd(metrica)]).rename(metrica).reset_index()
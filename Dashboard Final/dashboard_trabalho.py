@@ -1,27 +1,16 @@
 # Dashboard feito em Streamlit com gráficos Plotly e WordCloud
 # Mostra métricas, tendências e proporções de custos, funcionários e projetos
 
-# ---- Importação das bibliotecas principais ----
+# ---- Casca da página ----
+# Só o Streamlit e o tema são importados antes de a página aparecer; as outras bibliotecas vêm
+# depois, e as mais pesadas (plotly.express, wordcloud com o matplotlib) só quando são usadas
+import time
+
+inicio_script = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.io as pio
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
-
-# Cria um tema escuro personalizado chamado "construcao_dark"
-pio.templates["construcao_dark"] = pio.templates["plotly_dark"]
-pio.templates["construcao_dark"].layout.update(
-    font=dict(family="Segoe UI,sans-serif",
-              size=14,
-              color="#F3F5F7"),
-    title=dict(x=0.5,
-               font=dict(size=22, color="#00E0FF")), # centraliza o título
-    paper_bgcolor="#0B1F3A", # fundo da área total
-    plot_bgcolor="#0B1F3A",) # fundo da área de plotagem
-pio.templates.default = "construcao_dark" # define esse tema como padrão
 
+import tema
 
 # Define algumas características da aba no navegador, como título e título
 st.set_page_config(
@@ -30,305 +19,399 @@ st.set_page_config(
     layout="wide")
 
 # Adiciona estilos HTML e CSS para personalizar a aparência da interface
-st.markdown("""
-<style>
-.stApp {background-color: #0B1F3A; color: #F3F5F7; font-family: 'Segoe UI', sans-serif;}
-h1 {color: #00E0FF; text-align: center; margin-bottom: 0.3em; font-weight: 700;}
-.metric-card {background: #123057; padding: 20px; border-radius: 18px; box-shadow: 0 6px 18px rgba(0,0,0,0.5); text-align: center; transition: transform 0.3s, box-shadow 0.3s;}
-.metric-card:hover {transform: translateY(-6px); box-shadow: 0 12px 25px rgba(0,0,0,0.7);}
-.metric-icon {font-size: 40px; margin-bottom: 10px;}
-.metric-value {font-size: 28px; font-weight: 700; color: #00E0FF;}
-.metric-label {font-size: 16px; color: #F3F5F7;}
-.metric-change {font-size:14px; font-weight:600; margin-top:4px;}
-.metric-up {color:#00FF7F;}
-.metric-down {color:#FF4500;}
-.stSidebar .css-1d391kg {background-color: #123057; padding: 15px; border-radius: 15px;}
-.stSidebar h2, .stSidebar h3, .stSidebar label {color: #F3F5F7;}
-</style>
-""", unsafe_allow_html=True)
+st.markdown(tema.ESTILO, unsafe_allow_html=True)
 
 # Define o título da Dashboard
 st.title("🏗️ Dashboard Construção Civil")
 
-@st.cache_data(ttl=3600)
-def carregar_dados():
-    # carrega o .csv que tem nome padronizado, especificando as colunas
-    df = pd.read_csv("relatorio_construcoes.csv",
-                     usecols=[
-                         "Data",
-                         "Nome",
-                         "Sexo",
-                         "Regiao",
-                         "Projeto",
-                         "Funcionarios",
-                         "Tempo_conclusao_dias",
-                         "Custo_Reais"])
-    # converte a coluna Data para um formato datetime do pandas
-    df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-    # remove linhas sem data válida
-    df.dropna(subset=["Data"], inplace=True)
-    return df
-
-df = carregar_dados()
+# ---- Importação das bibliotecas principais ----
+# Na primeira execução do processo o tempo das importações entra no painel de desempenho
+inicio_importacoes = time.perf_counter()
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import plotly.io as pio
+
+import amostra
+import crescimento
+import figuras_binarias
+import granularidades
+import graficos
+import medicoes
+import nuvem_palavras
+from atualizador import Atualizador
+from cache_figuras import CacheFiguras, chave_estado
+from carga_dados import PREVIA, montar_dados, versao_origem
+from configuracao import (ARQUIVO_MEDICOES_JSON, ARQUIVO_MEDICOES_PROMETHEUS, BACKEND,
+                          CACHE_FIGURAS_MAX_ITENS, CACHE_FIGURAS_MAX_MB, ENVIO_BINARIO, FRACAO_PREVIA,
+                          INTERVALO_ATUALIZACAO_S, JANELA_CRESCIMENTO, LARGURA_GRAFICO_PX, LARGURA_SPARKLINE_PX,
+                          LIMITE_WEBGL, MEDICOES, MODO_INGESTAO, ORCAMENTO_PARTIDA_MS, ORCAMENTO_PREVIA_MS,
+                          THREADS_FIGURAS)
+from particoes import ConsultasParticionadas
+from selecao import Selecao
+segundos_importacoes = time.perf_counter() - inicio_importacoes
+
+# Medidor desta execução (None com as medições desligadas): as etapas marcadas daqui em
+# diante anotam nele o tempo, as linhas e a memória, mostrados no painel de desempenho
+medidor = medicoes.criar(MEDICOES)
+medicoes.ativar(medidor)
+medicoes.anotar("importacoes", segundos_importacoes)
+
+@st.cache_resource
+def carregar_totais_medicoes():
+    # totais das medições de todas as sessões do processo (e os arquivos onde são gravados)
+    return medicoes.Totais(ARQUIVO_MEDICOES_JSON, ARQUIVO_MEDICOES_PROMETHEUS)
+
+@st.cache_resource
+def carregar_atualizador():
+    # um único atualizador por processo: os dados ficam compartilhados entre as sessões e
+    # uma thread troca a versão servida quando o .csv muda, sem ninguém esperar a recarga.
+    # A versão entra na chave das figuras, então as da versão antiga não servem mais: na troca
+    # o cache de figuras é esvaziado, em vez de esperar que o LRU as descarte
+    return Atualizador(versao_origem,
+                       functools.partial(montar_dados, totais_medicoes=carregar_totais_medicoes()),
+                       INTERVALO_ATUALIZACAO_S,
+                       ao_trocar=carregar_cache_figuras().limpar)
+
+@st.cache_resource
+def carregar_cache_figuras():
+    # um único cache de figuras por processo, compartilhado por todas as sessões
+    return CacheFiguras(CACHE_FIGURAS_MAX_MB * 1024 * 1024, CACHE_FIGURAS_MAX_ITENS)
+
+@st.cache_resource
+def carregar_executor_figuras():
+    # threads que constroem as figuras ao mesmo tempo, compartilhadas por todas as sessões;
+    # com DASHBOARD_THREADS_FIGURAS 0 ou 1 não há pool e as figuras saem uma depois da outra
+    if THREADS_FIGURAS <= 1:
+        return None
+    return ThreadPoolExecutor(max_workers=THREADS_FIGURAS, thread_name_prefix="figuras")
+
+# Pega a versão dos dados que está no ar; ela vale até o fim desta execução, mesmo que a
+# thread de atualização troque a versão no meio. A versão também entra na chave do cache de figuras
+atualizador = carregar_atualizador()
+pacote_dados = atualizador.atual()
+versao_dados = chave_estado(BACKEND, MODO_INGESTAO, pacote_dados["versao"])
+consultas = pacote_dados["dados"]
+cache_graficos = carregar_cache_figuras()
+
+# Opções dos filtros, já ordenadas e calculadas uma única vez na carga
+opcoes = consultas.opcoes()
 
 # Cria o menu vertical que controla os filtos
 st.sidebar.header("🎛️ Filtros Avançados")
 
 # Cria o filtro de regiões
 regioes = st.sidebar.multiselect("🌍 Região:",
-                                 sorted(df["Regiao"].unique()),
-                                 default=df["Regiao"].unique())
+                                 opcoes["Regiao"],
+                                 default=opcoes["Regiao"])
 
 # Cria o filtro de tipos de projeto
 projetos = st.sidebar.multiselect("🏗️ Tipo de Projeto:",
-                                  sorted(df["Projeto"].unique()),
-                                  default=df["Projeto"].unique())
+                                  opcoes["Projeto"],
+                                  default=opcoes["Projeto"])
 
 # Cria o filtro com base no ano dos projetos
 anos = st.sidebar.multiselect("🗓️ Anos dos Projetos:",
-                              sorted(df["Data"].dt.year.unique()),
-                              default=df["Data"].dt.year.unique())
-
-# Filtra o df checando cada condição e retorna um df já filtrado
-df_filtrado = df[df["Regiao"].isin(regioes) & df["Projeto"].isin(projetos) & df["Data"].dt.year.isin(anos)]
-
-# Cria gráficos de linha simplificados usados nos cards de métricas
-def criar_sparkline(df, coluna_valor, coluna_data, cor="#00E0FF"):
-    df_spark = df.groupby(coluna_data,
-                          observed=True,
-                          sort=True)[coluna_valor].sum().reset_index()
-
-    # Cria um gráfico de linha simples (sparkline) mostrando tendência
-    fig = go.Figure(go.Scatter(x=df_spark[coluna_data],
-                               y=df_spark[coluna_valor],
-                               mode='lines',
-                               line=dict(color=cor, width=2),
-                               fill='tozeroy'))
-
-    # Remove eixos e margens para um visual limpo
-    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0),
-                      xaxis=dict(showgrid=False, visible=False),
-                      yaxis=dict(showgrid=False, visible=False),
-                      paper_bgcolor='#123057', plot_bgcolor='#123057')
-
-    return fig
-
-# Aplica o layout escuro e mantém o padrão visual da dashboard
-def aplicar_dark_layout(fig):
-    fig.update_layout(paper_bgcolor="#0B1F3A",
-                      plot_bgcolor="#0B1F3A",
-                      font_color="#F3F5F7",
-                      title_font_color="#00E0FF",
-                      legend=dict(font=dict(color="#F3F5F7")),
-                      xaxis=dict(color="#F3F5F7", gridcolor="#1A3B60"),
-                      yaxis=dict(color="#F3F5F7", gridcolor="#1A3B60"))
-    return fig
-
-# Calcula o percentual de crescimento entre os dois períodos mais recentes
-def calcular_crescimento(df, coluna):
-    df_sorted = df.sort_values("Data")
-    # Se houver menos de duas datas, retorna 0 para evitar erro
-    if df_sorted["Data"].nunique() < 2:
-        return 0
-    ultimo = df_sorted[df_sorted["Data"] == df_sorted["Data"].max()][coluna].sum()
-    anterior = df_sorted[df_sorted["Data"] == df_sorted["Data"].unique()[-2]][coluna].sum()
-    return 0 if anterior == 0 else (ultimo - anterior) / anterior * 100
-
-# Calcula alguns valores já usando o df que passou pelos filtros avançados
-total_custo = df_filtrado["Custo_Reais"].sum()
-custo_medio = df_filtrado["Custo_Reais"].mean()
-media_funcionarios = df_filtrado["Funcionarios"].mean()
-media_tempo = df_filtrado["Tempo_conclusao_dias"].mean()
-crescimento_custo = calcular_crescimento(df_filtrado, "Custo_Reais")
-crescimento_func = calcular_crescimento(df_filtrado, "Funcionarios")
-crescimento_tempo = calcular_crescimento(df_filtrado, "Tempo_conclusao_dias")
-
-# Converte o separador de milhar da vírgula (,) para o ponto (.)
-total_custo_formatado = f'{total_custo:,.0f}'.replace(',', '.')
-custo_medio_formatado = f'{custo_medio:,.0f}'.replace(',', '.')
-
-# Cria uma exibição com 4 colunas para os cards de métricas
-col1, col2, col3, col4 = st.columns(4)
-
-# Cada bloco a seguir cria um card de métrica com sparkline abaixo
-
-with col1:
-    # Card de custo total
-    st.markdown(f"""
-    <div class='metric-card'>
-        <div class='metric-icon'>💰</div>
-        <div class='metric-value'>R$ {total_custo_formatado}</div>
-        <div class='metric-label'>Custo Total</div>
-        <div class='metric-change {"metric-up" if crescimento_custo>=0 else "metric-down"}'>
-            {"▲" if crescimento_custo>=0 else "▼"} {abs(crescimento_custo):.1f}%
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-    st.plotly_chart(criar_sparkline(df_filtrado,
-                                    "Custo_Reais",
-                                    "Data",
-                                    "#00E0FF"),
-                                    config={"displayModeBar": False,
-                                            "width": "content"},
-                                    key="spark_custo")
-
-with col2:
-    # Card de custo médio
-    st.markdown(f"""
-    <div class='metric-card'>
-        <div class='metric-icon'>📊</div>
-        <div class='metric-value'>R$ {custo_medio_formatado}</div>
-        <div class='metric-label'>Custo Médio</div>
-        <div class='metric-change {"metric-up" if crescimento_func>=0 else "metric-down"}'>
-            {"▲" if crescimento_func>=0 else "▼"} {abs(crescimento_func):.1f}%
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-    st.plotly_chart(criar_sparkline(df_filtrado,
-                                    "Custo_Reais",
-                                    "Data", "#33CFFF"),
-                                    config={"displayModeBar": False,
-                                            "width": "content"},
-                                    key="spark_medio")
-
-with col3:
-    # Card de média de funcionários
-    st.markdown(f"""
-    <div class='metric-card'>
-        <div class='metric-icon'>👷</div>
-        <div class='metric-value'>{media_funcionarios:,.0f}</div>
-        <div class='metric-label'>Média de Funcionários</div>
-        <div class='metric-change {"metric-up" if crescimento_func>=0 else "metric-down"}'>
-            {"▲" if crescimento_func>=0 else "▼"} {abs(crescimento_func):.1f}%
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-    st.plotly_chart(criar_sparkline(df_filtrado,
-                                    "Funcionarios",
-                                    "Data",
-                                    "#88E0FF"),
-                                    config={"displayModeBar": False,
-                                            "width": "content"},
-                                    key="spark_funcionarios")
-
-with col4:
-    # Card de tempo médio de conclusão
-    st.markdown(f"""
-    <div class='metric-card'>
-        <div class='metric-icon'>⏱️</div>
-        <div class='metric-value'>{media_tempo:,.0f} dias</div>
-        <div class='metric-label'>Duração Média</div>
-        <div class='metric-change {"metric-up" if crescimento_tempo>=0 else "metric-down"}'>
-            {"▲" if crescimento_tempo>=0 else "▼"} {abs(crescimento_tempo):.1f}%
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-    st.plotly_chart(criar_sparkline(df_filtrado,
-                                    "Tempo_conclusao_dias",
-                                    "Data",
-                                    "#00BFFF"),
-                                    config={"displayModeBar": False,
-                                            "width": "content"},
-                                    key="spark_tempo")
+                              opcoes["Ano"],
+                              default=opcoes["Ano"])
+
+# Cria o filtro do intervalo de datas (por padrão, todo o período dos dados)
+data_min, data_max = consultas.periodo()
+if data_min is not None:
+    data_min, data_max = data_min.date(), data_max.date()
+inicio, fim = data_min, data_max
+if data_min != data_max:
+    inicio, fim = st.sidebar.slider("📆 Período:",
+                                    min_value=data_min,
+                                    max_value=data_max,
+                                    value=(data_min, data_max),
+                                    format="DD/MM/YYYY")
+periodo_completo = (inicio, fim) == (data_min, data_max)
+
+# Cria a escolha do nível das séries temporais (sparklines e tendência): dia, semana, mês ou trimestre
+granularidade = st.sidebar.selectbox("⏳ Granularidade dos gráficos:",
+                                     list(granularidades.GRANULARIDADES),
+                                     format_func=granularidades.GRANULARIDADES.get)
+
+# Por padrão as séries longas são reduzidas à quantidade de pontos que cabe na largura
+# do gráfico; marcando esta opção todos os pontos são enviados ao navegador
+resolucao_completa = st.sidebar.checkbox("🔍 Resolução completa dos gráficos", value=False)
+limite_sparkline = None if resolucao_completa else LARGURA_SPARKLINE_PX
+limite_grafico = None if resolucao_completa else LARGURA_GRAFICO_PX
+
+# Séries com mais pontos que isto vão para o navegador como traços WebGL (Scattergl)
+limite_webgl = LIMITE_WEBGL or None
+
+# Mostra os cards aproximados, calculados da amostra estratificada, com a margem do intervalo
+# de confiança de 95%; ficam marcados como prévia até os valores exatos tomarem o lugar deles.
+# A amostra tem a fração pedida de cada grupo, mas nunca menos que o mínimo por grupo, então
+# a legenda mostra quantas linhas foram de fato sorteadas
+def mostrar_previa(estimativa, linhas_sorteadas):
+    sorteadas = f"{linhas_sorteadas:,}".replace(',', '.')
+    st.caption(f"⏳ Prévia: valores estimados com {sorteadas} linhas sorteadas (pelo menos {FRACAO_PREVIA:.1%} "
+               f"de cada região x projeto x ano; intervalo de confiança de 95%). Os valores exatos aparecem em seguida.")
+    for coluna, card in zip(st.columns(4), tema.cards_previa(estimativa)):
+        coluna.markdown(tema.card_previa_html(*card), unsafe_allow_html=True)
+
+# Depois de uma mudança de filtro (ou na primeira execução), com a prévia ligada e se o cubo
+# exato deve passar do orçamento, os cards aproximados aparecem logo, no lugar dos cards,
+# enquanto o cubo e as figuras são calculados
+area_previa = st.empty()
+chave_filtros = chave_estado(versao_dados, regioes, projetos, anos, inicio, fim)
+# A amostra só separa os anos, então a prévia fica para o período completo
+if (PREVIA and periodo_completo and st.session_state.get("filtros_previa") != chave_filtros
+        and consultas.segundos_previstos(regioes, projetos, anos) * 1000 > ORCAMENTO_PREVIA_MS):
+    with medicoes.etapa("previa") as registro:
+        df_amostra_filtrada = consultas.amostra(regioes, projetos, anos)
+        if df_amostra_filtrada is not None and len(df_amostra_filtrada):
+            registro["linhas"] = len(df_amostra_filtrada)
+            with area_previa.container():
+                mostrar_previa(amostra.estimar(df_amostra_filtrada), len(df_amostra_filtrada))
+st.session_state["filtros_previa"] = chave_filtros
+
+# Seleção dos filtros desta execução: filtra o cubo em cada nível, o histograma e as linhas
+# conforme os gráficos pedem, cada um no máximo uma vez. O histograma e os totais (cards,
+# barras, pizza e nuvem) são filtrados logo; as séries temporais, só se a figura não estiver no cache
+selecao = Selecao(consultas, regioes, projetos, anos, inicio, fim)
+selecao.totais()
+selecao.histograma()
+
+# Busca a figura no cache compartilhado ou a constrói; a chave junta a versão dos dados,
+# os filtros da barra lateral e os parâmetros próprios do gráfico
+def obter_figura(nome, construir, *parametros):
+    chave = chave_estado(versao_dados, nome, *selecao.chave(), *parametros)
+    return cache_graficos.obter(chave, medicoes.medido(f"figura_{nome}")(construir))
+
+# Constrói as figuras que faltam no cache ao mesmo tempo, no pool de threads (ou uma depois
+# da outra, sem pool), e devolve todas por nome. Os dados de cada figura que falta (cubo,
+# histograma, pontos da tendência) são lidos da seleção antes, nesta thread: a seleção guarda
+# o que já calculou sem trava, e as threads só recebem os dados prontos. O tempo de cada figura
+# é medido na própria thread e anotado depois no medidor da execução.
+# Com o envio binário, as figuras já ficam no cache prontas para sair com arrays tipados
+def construir_figuras(pedidos):
+    tempos = {}
+    dados = {}
+
+    def cronometrar(nome, construir):
+        def rodar():
+            inicio = time.perf_counter()
+            figura = construir(dados[nome])
+            if ENVIO_BINARIO:
+                figura = figuras_binarias.compactar(figura)
+            tempos[nome] = time.perf_counter() - inicio
+            return figura
+        return rodar
+
+    chaves = {nome: chave_estado(versao_dados, nome, *selecao.chave(), *parametros)
+              for nome, (parametros, _, _) in pedidos.items()}
+    nomes = {chave: nome for nome, chave in chaves.items()}
+
+    def ler_dados(faltando):
+        for chave in faltando:
+            dados[nomes[chave]] = pedidos[nomes[chave]][1]()
+
+    with medicoes.etapa("figuras"):
+        prontas = cache_graficos.obter_varios({chaves[nome]: cronometrar(nome, construir)
+                                               for nome, (_, _, construir) in pedidos.items()},
+                                              carregar_executor_figuras(),
+                                              preparar=ler_dados)
+        for nome in pedidos:
+            if nome in tempos:
+                medicoes.anotar(f"figura_{nome}", tempos[nome])
+    return {nome: prontas[chaves[nome]] for nome in pedidos}
+
+# Envia a figura ao navegador; é nesta chamada que o Plotly serializa a figura em JSON.
+# Com as medições ligadas a figura também é serializada antes, à parte, para anotar o tempo
+# da serialização e quantos bytes ela gera (o que dobra esse custo, só nesse modo)
+def exibir_grafico(figura, config, key):
+    if medicoes.atual() is not None:
+        with medicoes.etapa(f"serializacao_{key}") as registro:
+            registro["bytes"] = len(pio.to_json(figura, validate=False))
+    with medicoes.etapa(f"envio_{key}"):
+        st.plotly_chart(figura, config=config, key=key)
+
+
+# Cada parte da página é uma seção (st.fragment): um widget de dentro dela reexecuta só
+# aquela seção, e não o script inteiro. Numa reexecução só da seção não há medidor da
+# execução, então a seção usa o seu próprio
+def secao(nome):
+    def decorar(funcao):
+        @st.fragment
+        @functools.wraps(funcao)
+        def rodar(*entradas):
+            medidor_secao = medicoes.criar(MEDICOES) if medicoes.atual() is None else None
+            with medicoes.usando(medidor_secao or medicoes.atual()), medicoes.etapa(f"secao_{nome}"):
+                funcao(*entradas)
+            if medidor_secao is not None:
+                carregar_totais_medicoes().registrar(medidor_secao, "secao")
+        return rodar
+    return decorar
+
+# Resultado guardado na sessão: só é recalculado quando as entradas declaradas mudam
+# (a versão dos dados sempre conta)
+def memorizar(nome, entradas, calcular):
+    chave = chave_estado(versao_dados, nome, *entradas)
+    guardado = st.session_state.get(f"secao_{nome}")
+    if guardado is None or guardado[0] != chave:
+        guardado = (chave, calcular())
+        st.session_state[f"secao_{nome}"] = guardado
+    return guardado[1]
+
+# Seção dos cards: depende da seleção, da comparação escolhida e das sparklines. Os quatro
+# cards vão para a página antes de as figuras serem construídas, e as sparklines entram
+# depois, cada uma no espaço reservado abaixo do seu card
+@secao("cards")
+def secao_cards(selecao, obter_figuras):
+    # Escolhe com qual período anterior os cards de métricas são comparados. A escolha fica no
+    # corpo da seção, acima dos cards: um fragmento não pode pôr widgets na barra lateral, e
+    # aqui trocá-la só reexecuta os cards
+    janelas = list(crescimento.JANELAS)
+    janela = st.columns(4)[0].selectbox("📈 Comparação dos Cards:",
+                                        janelas,
+                                        index=janelas.index(JANELA_CRESCIMENTO) if JANELA_CRESCIMENTO in janelas else 0,
+                                        format_func=crescimento.JANELAS.get)
+
+    # Os valores dos cards saem da seleção, que filtrou o cubo pelos filtros avançados
+    valores = memorizar("cards", (*selecao.chave(), janela), lambda: selecao.cards(janela))
+
+    # Cria uma exibição com 4 colunas para os cards de métricas, cada um com a sparkline abaixo
+    vagas = []
+    for coluna, (icone, rotulo, valor, variacao, sparkline) in zip(st.columns(4), tema.cards_metricas(valores)):
+        coluna.markdown(tema.card_html(icone, rotulo, valor, variacao), unsafe_allow_html=True)
+        vagas.append((coluna.container(), sparkline))
+
+    # Numa execução completa, o tempo do início do script até os cards estarem na página
+    if medicoes.atual() is medidor:
+        medicoes.anotar("primeira_pintura", time.perf_counter() - inicio_script)
+
+    figuras = obter_figuras()
+    for vaga, sparkline in vagas:
+        with vaga:
+            exibir_grafico(figuras[sparkline],
+                           config={"displayModeBar": False,
+                                   "width": "content"},
+                           key=sparkline)
+
+# Seção dos gráficos de barras, boxplot e pizza: só mostra as figuras prontas
+@secao("graficos")
+def secao_graficos(figuras):
+    # Inicia a área de gráficos principais em duas colunas
+    col1, col2 = st.columns(2)
+    with col1:
+        # Gráfico de barras: custo total por tipo de projeto
+        exibir_grafico(figuras["fig1"], {"width": "content"}, "fig1")
+
+    with col2:
+        # Gráfico de barras: custo médio por tipo de projeto
+        exibir_grafico(figuras["fig2"], {"width": "content"}, "fig2")
+
+    # Cria uma nova linha de dois gráficos
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Boxplot mostrando a variação no número de funcionários por projeto
+        exibir_grafico(figuras["fig3"], {"width": "content"}, "fig3")
+
+    with col2:
+        # Gráfico de pizza mostrando a proporção de custos por região
+        exibir_grafico(figuras["fig4"], {"width": "content"}, "fig4")
+
+# Seção do gráfico de tendência: mostra a figura pronta
+@secao("tendencia")
+def secao_tendencia(figuras):
+    # Gráfico de linha para acompanhar a evolução dos custos ao longo do tempo
+    exibir_grafico(figuras["fig5"], {"width": "content"}, "fig5")
+
+# Seção da nuvem de palavras: mostrar ou esconder a nuvem só reexecuta esta seção
+@secao("nuvem")
+def secao_nuvem(selecao):
+    # Cria um título HTML centralizado
+    st.markdown("<h2 style='text-align:center; color:#00E0FF;'>☁️ Nuvem de Palavras - Projetos</h2>", unsafe_allow_html=True)
+
+    # A nuvem pode ser escondida; nesse caso nada dela é calculado nem importado
+    if st.toggle("Mostrar nuvem de palavras", value=True):
+        # Conta quantas linhas cada tipo de projeto tem (direto do cubo, também no modo streaming)
+        df_totais = selecao.totais()
+        with medicoes.etapa("nuvem_frequencias", len(df_totais)):
+            frequencias = memorizar("nuvem", selecao.chave(),
+                                    lambda: nuvem_palavras.frequencias(df_totais))
+
+        # Gera a nuvem de palavras apenas se houver projetos
+        if frequencias:
+            # A imagem pronta fica no cache de figuras, junto com os gráficos do mesmo filtro
+            png = obter_figura("nuvem", lambda: nuvem_palavras.gerar_png(frequencias))
+            with medicoes.etapa("envio_nuvem"):
+                st.image(png)
+        else:
+            # Caso não haja projetos suficientes para gerar a nuvem
+            st.info("Não há dados suficientes para gerar a nuvem de palavras.")
+
+# Constrói (ou pega do cache) todas as figuras de uma vez, quando a seção dos cards pede,
+# depois de os cards já estarem na página
+@functools.cache
+def obter_figuras():
+    return construir_figuras(graficos.pedidos_figuras(selecao, granularidade, limite_sparkline, limite_grafico,
+                                                      limite_webgl))
+
+# Monta a página, seção por seção; os cards exatos substituem a prévia
+area_previa.empty()
+secao_cards(selecao, obter_figuras)
+figuras = obter_figuras()
 
 # Cria uma linha de separação na página web da Dashboard
 st.markdown("---")
 
-# Inicia a área de gráficos principais em duas colunas
-col1, col2 = st.columns(2)
-with col1:
-    # Gráfico de barras: custo total por tipo de projeto
-    fig1 = px.bar(df_filtrado.groupby("Projeto", observed=True)["Custo_Reais"].sum().reset_index(),
-                  x="Projeto",
-                  y="Custo_Reais",
-                  color="Projeto",
-                  labels={"Custo_Reais": "Custos"},
-                  text_auto=True,
-                  color_discrete_sequence=["#33CFFF", "#00E0FF", "#88E0FF", "#00BFFF"],
-                  title="💰 Custo Total por Tipo de Projeto")
-    aplicar_dark_layout(fig1)
-    st.plotly_chart(fig1, config={"width": "content"}, key="fig1")
-
-with col2:
-    # Gráfico de barras: custo médio por tipo de projeto
-    fig2 = px.bar(df_filtrado.groupby("Projeto", observed=True)["Custo_Reais"].mean().reset_index(),
-               x="Projeto",
-               y="Custo_Reais",
-               color="Projeto",
-               labels={"Custo_Reais": "Média de Custos"},
-               text_auto=True,
-               color_discrete_sequence=["#33CFFF", "#00E0FF", "#88E0FF", "#00BFFF"],
-               title="💰 Custo Médio por Tipo de Projeto")
-    aplicar_dark_layout(fig2)
-    st.plotly_chart(fig2, config={"width": "content"}, key="fig2")
-
-# Cria uma nova linha de dois gráficos
-col1, col2 = st.columns(2)
-
-with col1:
-    # Boxplot mostrando a variação no número de funcionários por projeto
-    fig3 = px.box(df_filtrado,
-              x="Projeto",
-              y="Funcionarios",
-              color="Projeto",
-              labels={"Funcionarios": "Funcionários"},
-              points="all",
-              color_discrete_sequence=["#33CFFF", "#88E0FF", "#00E0FF"],
-              title="👷 Distribuição de Funcionários por Tipo de Projeto")
-    aplicar_dark_layout(fig3)
-    st.plotly_chart(fig3, config={"width": "content"}, key="fig3")
-
-with col2:
-    # Gráfico de pizza mostrando a proporção de custos por região
-    fig4 = px.pie(df_filtrado,
-                  names="Regiao",
-                  values="Custo_Reais",
-                  hole=0.4,
-                  color_discrete_sequence=px.colors.sequential.Reds,
-                  labels={"Custo_Reais": "Custos"},
-                  title="🌎 Proporção dos Custos por Região")
-    aplicar_dark_layout(fig4)
-    st.plotly_chart(fig4, config={"width": "content"}, key="fig4")
-
-# Cria um gráfico de linha para acompanhar a evolução dos custos ao longo do tempo
-fig5 = px.line(df_filtrado.sort_values("Data"),
-               x="Data",
-               y="Custo_Reais",
-               color="Projeto",
-               labels={"Custo_Reais": "Custos"},
-               markers=True,
-               color_discrete_sequence=["#33FF5F", "#00E0FF", "#FDFF88", "#4400FF"],
-               title="📅 Tendência de Custos por Projeto")
-aplicar_dark_layout(fig5)
-# Aumenta a espessura das linhas para melhor visualização
-fig5.update_traces(line=dict(width=3))
-st.plotly_chart(fig5, config={"width": "content"}, key="fig5")
+secao_graficos(figuras)
+secao_tendencia(figuras)
 
 # Adiciona uma linha divisória antes da nuvem de palavras
 st.markdown("---")
 
-# Cria um título HTML centralizado
-st.markdown("<h2 style='text-align:center; color:#00E0FF;'>☁️ Nuvem de Palavras - Projetos</h2>", unsafe_allow_html=True)
-
-# Junta todos os nomes dos projetos em uma única string
-textos = " ".join(df_filtrado["Projeto"].astype(str).tolist())
-
-# Gera a nuvem de palavras apenas se houver texto suficiente
-if textos.strip():
-    wordcloud = WordCloud(width=800,
-                          height=300,
-                          background_color="#0B1F3A",
-                          colormap="Blues",
-                          prefer_horizontal=0.9,
-                          max_words=80,
-                          collocations=False,
-                          contour_color="#00E0FF",
-                          contour_width=2).generate(textos)
-    # Plota a nuvem de palavras
-    fig, ax = plt.subplots(figsize=(10, 4))
-    ax.imshow(wordcloud, interpolation="bilinear")
-    ax.axis("off")
-    st.pyplot(fig, width="content")
-else:
-    # Caso não haja projetos suficientes para gerar a nuvem
-    st.info("Não há dados suficientes para gerar a nuvem de palavras.")
+secao_nuvem(selecao)
+
+# Mostra na barra lateral o aproveitamento do cache de figuras
+estatisticas_cache = cache_graficos.estatisticas()
+st.sidebar.caption(f"🗂️ Cache de gráficos: {estatisticas_cache['acertos']} acertos, "
+                   f"{estatisticas_cache['falhas']} falhas, {estatisticas_cache['itens']} figuras "
+                   f"({estatisticas_cache['bytes'] / 1024 / 1024:.1f} MB)")
+
+# Mostra na barra lateral qual versão dos dados está sendo servida e há quanto tempo foi carregada
+idade_min = (time.time() - pacote_dados["carregado_em"]) / 60
+st.sidebar.caption(f"🕒 Dados: versão {versao_dados[:8]}, carregada há {idade_min:.0f} min"
+                   + (" (atualizando...)" if atualizador.atualizando else ""))
+if isinstance(consultas, ConsultasParticionadas):
+    estatisticas_particoes = consultas.estatisticas()
+    st.sidebar.caption(f"🗃️ Partições carregadas: {estatisticas_particoes['carregadas']} "
+                       f"de {estatisticas_particoes['total']}")
+if atualizador.ultimo_erro:
+    st.sidebar.caption(f"⚠️ Última atualização falhou, mantendo a versão anterior: {atualizador.ultimo_erro}")
+
+# Painel de desempenho: etapas desta execução e da última carga dos dados, com o tempo,
+# as linhas e (no nível "memoria") o pico de memória de cada uma
+if medidor is not None:
+    totais_medicoes = carregar_totais_medicoes()
+    resumo_execucao = totais_medicoes.registrar(medidor, "execucao")
+    with st.sidebar.expander("⏱️ Desempenho"):
+        st.caption(f"Esta execução: {resumo_execucao['segundos_total'] * 1000:.0f} ms")
+        # Partida: quanto as importações custaram (só pesam na primeira execução do processo) e
+        # quando os cards apareceram, comparado com o orçamento de DASHBOARD_ORCAMENTO_PARTIDA_MS
+        partida = {e["etapa"]: e["segundos"] * 1000 for e in resumo_execucao["etapas"]
+                   if e["etapa"] in ("importacoes", "primeira_pintura")}
+        if "primeira_pintura" in partida:
+            st.caption(f"Partida: importações em {partida['importacoes']:.0f} ms, cards na página em "
+                       f"{partida['primeira_pintura']:.0f} ms (orçamento: {ORCAMENTO_PARTIDA_MS} ms)"
+                       + (" ⚠️ acima do orçamento" if partida["primeira_pintura"] > ORCAMENTO_PARTIDA_MS else ""))
+        serializacoes = [e for e in resumo_execucao["etapas"] if e["etapa"].startswith("serializacao_")]
+        if serializacoes:
+            st.caption(f"Figuras enviadas: {sum(e['bytes'] for e in serializacoes) / 1024:.0f} KB, "
+                       f"serializadas em {sum(e['segundos'] for e in serializacoes) * 1000:.0f} ms"
+                       + (" (arrays binários)" if ENVIO_BINARIO else " (JSON do Plotly)"))
+        st.dataframe(medicoes.tabela(resumo_execucao), hide_index=True)
+        resumo_carga = totais_medicoes.ultimos.get("carga")
+        if resumo_carga:
+            st.caption(f"Última carga dos dados ({resumo_carga['inicio']}): "
+                       f"{resumo_carga['segundos_total'] * 1000:.0f} ms")
+            st.dataframe(medicoes.tabela(resumo_carga), hide_index=True)
+
+# Fim da execução: reexecuções só de uma seção criam o próprio medidor
+medicoes.ativar(None)
@@ -0,0 +1,98 @@
+# Estatísticas do boxplot de funcionários calculadas no servidor
+# Em vez de enviar cada valor de Funcionarios ao navegador, guardamos um histograma exato
+# (contagem por valor) para cada (Regiao, Projeto, Ano). Funcionarios é uma contagem inteira,
+# então o número de valores distintos é pequeno; o histograma pode ser filtrado como o cubo,
+# somado entre blocos no modo streaming, e dele saem quartis exatos e os outliers
+
+import numpy as np
+import pandas as pd
+
+# Dimensões do histograma (as mesmas usadas pelos filtros da barra lateral)
+DIMENSOES = ["Regiao", "Projeto", "Ano"]
+
+# Coluna cuja distribuição aparece no boxplot
+COLUNA = "Funcionarios"
+
+# Quantidade máxima de outliers desenhados por projeto e semente do sorteio (reprodutível)
+MAX_OUTLIERS = 200
+SEMENTE = 0
+
+
+# Conta quantas vezes cada valor aparece por (Regiao, Projeto, Ano)
+def histograma(df, coluna=COLUNA):
+    base = pd.DataFrame({"Regiao": df["Regiao"],
+                         "Projeto": df["Projeto"],
+                         "Ano": df["Data"].dt.year.astype("int16"),
+                         "valor": df[coluna]}).dropna(subset=["valor"])
+    return base.groupby(DIMENSOES + ["valor"], observed=True, sort=False).size().rename("qtd").reset_index()
+
+
+# Junta histogramas parciais (de blocos diferentes) somando as contagens
+def combinar(partes):
+    partes = [p for p in partes if len(p)]
+    if not partes:
+        return pd.DataFrame(columns=DIMENSOES + ["valor", "qtd"])
+    juntos = pd.concat(partes, ignore_index=True)
+    for dimensao in ["Regiao", "Projeto"]:
+        juntos[dimensao] = juntos[dimensao].astype(str)
+    return juntos.groupby(DIMENSOES + ["valor"], sort=False)["qtd"].sum().reset_index()
+
+
+def finalizar(hist):
+    hist = hist.sort_values(DIMENSOES + ["valor"]).reset_index(drop=True)
+    for dimensao in ["Regiao", "Projeto"]:
+        hist[dimensao] = hist[dimensao].astype("category")
+    hist["Ano"] = hist["Ano"].astype("int16")
+    hist["qtd"] = hist["qtd"].astype("int64")
+    return hist
+
+
+# Monta o histograma completo a partir de um DataFrame de linhas brutas
+def montar(df):
+    return finalizar(histograma(df))
+
+
+# Quantil com interpolação linear (o mesmo método padrão do numpy e do Plotly) a partir
+# de valores ordenados e suas contagens acumuladas
+def _quantil(valores, acumulado, p):
+    posicao = (acumulado[-1] - 1) * p
+    abaixo = int(np.floor(posicao))
+    acima = int(np.ceil(posicao))
+    valor_abaixo = valores[np.searchsorted(acumulado, abaixo, side="right")]
+    valor_acima = valores[np.searchsorted(acumulado, acima, side="right")]
+    return valor_abaixo + (valor_acima - valor_abaixo) * (posicao - abaixo)
+
+
+# Resume a distribuição de um projeto: quartis, cercas (whiskers) e outliers
+def _resumir(valores, contagens, max_outliers, rng):
+    acumulado = np.cumsum(contagens)
+    q1, mediana, q3 = (_quantil(valores, acumulado, p) for p in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    dentro = (valores >= q1 - 1.5 * iqr) & (valores <= q3 + 1.5 * iqr)
+
+    # Os outliers são valores distintos; um sorteio com semente fixa limita quantos vão ao gráfico
+    outliers = valores[~dentro]
+    if len(outliers) > max_outliers:
+        outliers = np.sort(rng.choice(outliers, max_outliers, replace=False))
+    return {"q1": float(q1),
+            "mediana": float(mediana),
+            "q3": float(q3),
+            "cerca_inferior": float(valores[dentro].min()),
+            "cerca_superior": float(valores[dentro].max()),
+            "media": float(np.dot(valores, contagens) / acumulado[-1]),
+            "qtd": int(acumulado[-1]),
+            "outliers": outliers.tolist()}
+
+
+# Calcula o resumo do boxplot para cada projeto de um histograma já filtrado
+def resumo_por_projeto(hist, max_outliers=MAX_OUTLIERS, semente=SEMENTE):
+    rng = np.random.default_rng(semente)
+    resumos = {}
+    por_valor = hist.groupby(["Projeto", "valor"], observed=True, sort=True)["qtd"].sum()
+    for projeto, serie in por_valor.groupby(level="Projeto", observed=True, sort=True):
+        serie = serie[serie > 0]
+        if serie.empty:
+            continue
+        valores = serie.index.get_level_values("valor").to_numpy(dtype="float64")
+        resumos[projeto] = _resumir(valores, serie.to_numpy(), max_outliers, rng)
+    return resumos
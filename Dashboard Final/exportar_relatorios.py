@@ -0,0 +1,259 @@
+# Exportador de relatórios estáticos da dashboard
+# Gera, sem o Streamlit, uma página HTML independente (e, com o kaleido instalado, as figuras em
+# PNG) para cada preset de filtros: os mesmos cards, gráficos e nuvem da dashboard, montados pela
+# mesma carga (carga_dados), seleção (selecao) e figuras (graficos). Os dados são carregados uma
+# vez no processo principal e os presets são distribuídos por um pool de processos, que herdam
+# os dados já carregados. No fim mostra quantos presets por segundo foram exportados.
+# Uso: python exportar_relatorios.py [--presets presets.json] [--saida relatorios] [--processos 4]
+#                                    [--formatos html png] [--granularidade mes] [--plotlyjs cdn]
+# Sem --presets sai um relatório geral, um por região e um por tipo de projeto. O arquivo de
+# presets é uma lista JSON de {"nome", "regioes", "projetos", "anos", "inicio", "fim"}; o que
+# faltar vale tudo (as datas são "AAAA-MM-DD"). As variáveis DASHBOARD_* valem também aqui
+
+import argparse
+import base64
+import datetime
+import html
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import plotly.offline
+
+import crescimento
+import figuras_binarias
+import granularidades
+import graficos
+import nuvem_palavras
+import tema
+from banco_sqlite import ConsultasSQLite
+from carga_dados import montar_consultas
+from configuracao import (ENVIO_BINARIO, JANELA_CRESCIMENTO, LARGURA_GRAFICO_PX, LARGURA_SPARKLINE_PX,
+                          LIMITE_WEBGL)
+from particoes import ConsultasParticionadas
+from selecao import Selecao
+
+# Disposição da página: os cards em quatro colunas e os gráficos em duas, como na dashboard
+LAYOUT = """
+<style>
+body {margin: 0 auto; padding: 24px; max-width: 1400px;}
+.colunas {display: grid; gap: 16px; margin-bottom: 16px;}
+.colunas-4 {grid-template-columns: repeat(4, 1fr);}
+.colunas-2 {grid-template-columns: repeat(2, 1fr);}
+.filtros, .rodape {color: #9FB3C8; text-align: center;}
+h2 {text-align: center; color: #00E0FF;}
+.nuvem {display: block; margin: 0 auto;}
+</style>
+"""
+
+# Consultas deste processo: carregadas no processo principal e herdadas pelos processos do pool
+# (fork); onde os processos começam do zero (spawn) cada um carrega as suas pelo cache em disco
+_consultas = None
+
+
+# Nome de arquivo a partir do nome do preset: "Região Sul" -> "regiao_sul"
+def nome_arquivo(nome):
+    texto = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "_", texto.lower()).strip("_") or "relatorio"
+
+
+# Relatório geral, um por região e um por tipo de projeto
+def presets_padrao(opcoes):
+    presets = [{"nome": "Geral"}]
+    presets += [{"nome": f"Região {regiao}", "regioes": [regiao]} for regiao in opcoes["Regiao"]]
+    presets += [{"nome": f"Projeto {projeto}", "projetos": [projeto]} for projeto in opcoes["Projeto"]]
+    return presets
+
+
+# Completa um preset com os filtros que faltam (tudo selecionado) e confere os valores
+def completar(preset, opcoes):
+    completo = {"nome": preset["nome"],
+                "arquivo": nome_arquivo(preset["nome"]),
+                "regioes": preset.get("regioes", opcoes["Regiao"]),
+                "projetos": preset.get("projetos", opcoes["Projeto"]),
+                "anos": [int(ano) for ano in preset.get("anos", opcoes["Ano"])],
+                "inicio": datetime.date.fromisoformat(preset["inicio"]) if preset.get("inicio") else None,
+                "fim": datetime.date.fromisoformat(preset["fim"]) if preset.get("fim") else None}
+    for chave, dimensao in (("regioes", "Regiao"), ("projetos", "Projeto"), ("anos", "Ano")):
+        desconhecidos = set(completo[chave]) - set(opcoes[dimensao])
+        if desconhecidos:
+            raise ValueError(f"Preset {preset['nome']!r}: {dimensao} sem dados: {sorted(desconhecidos)}")
+    return completo
+
+
+def ler_presets(caminho, opcoes):
+    with open(caminho, encoding="utf-8") as f:
+        return [completar(preset, opcoes) for preset in json.load(f)]
+
+
+# Roda no começo de cada processo do pool
+def iniciar_processo():
+    global _consultas
+    if _consultas is None:
+        _consultas = montar_consultas()
+    elif isinstance(_consultas, ConsultasSQLite):
+        _consultas.reabrir()
+
+
+# Tag que traz o plotly.js: embutido (a página abre sem internet) ou da CDN (página bem menor)
+def script_plotlyjs(origem):
+    if origem == "cdn":
+        return f'<script src="https://cdn.plot.ly/plotly-{plotly.offline.get_plotlyjs_version()}.min.js"></script>'
+    return f'<script type="text/javascript">{plotly.offline.get_plotlyjs()}</script>'
+
+
+def _figura_html(figura, **config):
+    if ENVIO_BINARIO:
+        figura = figuras_binarias.compactar(figura)
+    return figura.to_html(full_html=False, include_plotlyjs=False, config=config)
+
+
+def _descrever(valores, opcoes_todas):
+    return "todos" if opcoes_todas else ", ".join(map(str, valores)) or "nenhum"
+
+
+# Página HTML do preset, com a mesma ordem da dashboard: cards com sparklines, barras, boxplot
+# e pizza, tendência e nuvem de palavras
+def pagina_html(preset, selecao, valores, figuras, png_nuvem, janela, plotlyjs, opcoes):
+    cards = "".join(f"<div>{tema.card_html(icone, rotulo, valor, variacao)}"
+                    f"{_figura_html(figuras[sparkline], displayModeBar=False)}</div>"
+                    for icone, rotulo, valor, variacao, sparkline in tema.cards_metricas(valores))
+    graficos_principais = "".join(f"<div class='colunas colunas-2'>{_figura_html(figuras[a])}{_figura_html(figuras[b])}</div>"
+                                  for a, b in (("fig1", "fig2"), ("fig3", "fig4")))
+    if png_nuvem is None:
+        nuvem = "<p class='filtros'>Não há dados suficientes para gerar a nuvem de palavras.</p>"
+    else:
+        nuvem = f"<img class='nuvem' src='data:image/png;base64,{base64.b64encode(png_nuvem).decode('ascii')}'>"
+    filtros = (f"Regiões: {_descrever(preset['regioes'], preset['regioes'] == opcoes['Regiao'])} · "
+               f"Projetos: {_descrever(preset['projetos'], preset['projetos'] == opcoes['Projeto'])} · "
+               f"Anos: {_descrever(preset['anos'], preset['anos'] == opcoes['Ano'])} · "
+               f"Período: {selecao.inicio:%d/%m/%Y} a {selecao.fim:%d/%m/%Y} · "
+               f"Comparação: {crescimento.JANELAS[janela]}")
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>🏗️ Dashboard Construção Civil - {html.escape(preset['nome'])}</title>
+{script_plotlyjs(plotlyjs)}
+{tema.ESTILO}
+{LAYOUT}
+</head>
+<body class="stApp">
+<h1>🏗️ Dashboard Construção Civil - {html.escape(preset['nome'])}</h1>
+<p class="filtros">{html.escape(filtros)}</p>
+<div class="colunas colunas-4">{cards}</div>
+{graficos_principais}
+{_figura_html(figuras['fig5'])}
+<h2>☁️ Nuvem de Palavras - Projetos</h2>
+{nuvem}
+<p class="rodape">Gerado em {datetime.datetime.now():%d/%m/%Y %H:%M}</p>
+</body>
+</html>
+"""
+
+
+# Exporta um preset (roda num processo do pool) e devolve o nome, o tempo e os arquivos gravados
+def exportar(preset, pasta, formatos, granularidade, janela, plotlyjs, opcoes):
+    inicio = time.perf_counter()
+    selecao = Selecao(_consultas, preset["regioes"], preset["projetos"], preset["anos"],
+                      preset["inicio"], preset["fim"])
+    pedidos = graficos.pedidos_figuras(selecao, granularidade, LARGURA_SPARKLINE_PX, LARGURA_GRAFICO_PX,
+                                       LIMITE_WEBGL or None)
+    figuras = {nome: construir(dados()) for nome, (_, dados, construir) in pedidos.items()}
+    valores = selecao.cards(janela)
+    frequencias = nuvem_palavras.frequencias(selecao.totais())
+    png_nuvem = nuvem_palavras.gerar_png(frequencias) if frequencias else None
+
+    arquivos = []
+    base = os.path.join(pasta, preset["arquivo"])
+    if "html" in formatos:
+        with open(f"{base}.html", "w", encoding="utf-8") as f:
+            f.write(pagina_html(preset, selecao, valores, figuras, png_nuvem, janela, plotlyjs, opcoes))
+        arquivos.append(f"{base}.html")
+    if "png" in formatos:
+        # Uma imagem por figura, numa pasta com o nome do preset
+        os.makedirs(base, exist_ok=True)
+        for nome, figura in figuras.items():
+            figura.write_image(os.path.join(base, f"{nome}.png"))
+            arquivos.append(os.path.join(base, f"{nome}.png"))
+        if png_nuvem is not None:
+            with open(os.path.join(base, "nuvem.png"), "wb") as f:
+                f.write(png_nuvem)
+            arquivos.append(os.path.join(base, "nuvem.png"))
+    return preset["nome"], time.perf_counter() - inicio, arquivos
+
+
+# Mostra o resultado de um preset; uma falha não interrompe os outros
+def relatar(nome_preset, obter):
+    try:
+        nome, segundos, arquivos = obter()
+    except Exception as erro:
+        print(f"{nome_preset}: FALHOU ({erro!r})", file=sys.stderr)
+        return False
+    print(f"{nome}: {segundos:.2f} s, {len(arquivos)} arquivo(s)", file=sys.stderr)
+    return True
+
+
+def main():
+    global _consultas
+    parser = argparse.ArgumentParser(description="Exporta relatórios estáticos da dashboard, um por preset de filtros")
+    parser.add_argument("--presets", help="arquivo JSON com a lista de presets (padrão: geral, por região e por projeto)")
+    parser.add_argument("--saida", default="relatorios", help="pasta dos relatórios")
+    parser.add_argument("--formatos", nargs="+", choices=["html", "png"], default=["html"])
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1,
+                        help="processos que exportam ao mesmo tempo (1: um preset depois do outro, sem pool)")
+    parser.add_argument("--granularidade", choices=list(granularidades.GRANULARIDADES), default="dia",
+                        help="nível das sparklines e da tendência")
+    parser.add_argument("--janela", choices=list(crescimento.JANELAS), default=JANELA_CRESCIMENTO,
+                        help="comparação dos cards")
+    parser.add_argument("--plotlyjs", choices=["embutido", "cdn"], default="embutido",
+                        help="plotly.js dentro de cada página ou carregado da CDN")
+    args = parser.parse_args()
+    if "png" in args.formatos and importlib.util.find_spec("kaleido") is None:
+        parser.error("exportar em PNG precisa do pacote kaleido (pip install kaleido)")
+
+    inicio = time.perf_counter()
+    _consultas = montar_consultas()
+    opcoes = _consultas.opcoes()
+    try:
+        presets = ler_presets(args.presets, opcoes) if args.presets else [completar(preset, opcoes)
+                                                                           for preset in presets_padrao(opcoes)]
+    except (OSError, ValueError, KeyError) as erro:
+        parser.error(f"presets inválidos: {erro}")
+    if not presets:
+        parser.error("nenhum preset para exportar")
+    # Com partições, carrega aqui tudo o que os presets vão ler, uma vez só para todos os processos
+    if isinstance(_consultas, ConsultasParticionadas):
+        _consultas.preparar(sorted({regiao for preset in presets for regiao in preset["regioes"]}),
+                            sorted({projeto for preset in presets for projeto in preset["projetos"]}),
+                            sorted({ano for preset in presets for ano in preset["anos"]}))
+    # O tema também é montado uma vez aqui, e os processos do pool já o recebem pronto
+    tema.registrar()
+    print(f"Dados carregados em {time.perf_counter() - inicio:.2f} s", file=sys.stderr)
+
+    os.makedirs(args.saida, exist_ok=True)
+    parametros = (args.saida, args.formatos, args.granularidade, args.janela, args.plotlyjs, opcoes)
+    inicio = time.perf_counter()
+    if args.processos <= 1:
+        falhas = sum(not relatar(preset["nome"], lambda preset=preset: exportar(preset, *parametros))
+                     for preset in presets)
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.processos, len(presets)),
+                                 initializer=iniciar_processo) as executor:
+            futuros = {executor.submit(exportar, preset, *parametros): preset["nome"] for preset in presets}
+            falhas = sum(not relatar(futuros[futuro], futuro.result) for futuro in as_completed(futuros))
+    segundos = time.perf_counter() - inicio
+
+    exportados = len(presets) - falhas
+    print(f"{exportados} presets em {segundos:.2f} s ({exportados / segundos:.2f} presets/s) em {args.saida}")
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Envio compacto das figuras ao navegador
+# Por padrão o Plotly escreve cada número dos arrays como texto no JSON, e cada data como um
+# texto ISO de 19 caracteres. O plotly.js também aceita arrays tipados: {"dtype": "f8", "bdata":
+# <bytes em base64>}, que saem do numpy sem formatar número por número e ocupam menos.
+# FiguraBinaria é uma figura comum que, ao virar dicionário (o que o Streamlit faz antes de
+# gerar o JSON, e o cache de figuras ao medir o tamanho), troca os arrays numéricos dos traços
+# por arrays tipados; as datas vão como milissegundos desde 1970 num eixo do tipo "date"
+
+import base64
+import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Campos dos traços que podem levar arrays longos
+CAMPOS = ["x", "y"]
+
+# Tipos do numpy aceitos pelo plotly.js (ele não lê inteiros de 64 bits)
+TIPOS = {"float64": "f8", "float32": "f4", "int32": "i4", "uint32": "u4", "int16": "i2", "uint16": "u2",
+         "int8": "i1", "uint8": "u1"}
+
+
+# Array tipado do plotly.js para um array do numpy
+def _tipado(valores):
+    return {"dtype": TIPOS[valores.dtype.name], "bdata": base64.b64encode(valores.tobytes()).decode("ascii")}
+
+
+# Converte um array para um array tipado; devolve None se ele não for numérico nem de datas.
+# A segunda resposta diz se os valores eram datas
+def codificar(valores):
+    if not isinstance(valores, np.ndarray) or valores.ndim != 1 or not len(valores):
+        return None, False
+    if valores.dtype.kind == "O":
+        # O Plotly guarda as datas de um DataFrame como objetos (datetime ou Timestamp)
+        if not isinstance(valores[0], (datetime.datetime, np.datetime64)):
+            return None, False
+        valores = pd.to_datetime(valores)
+        if valores.hasnans:
+            return None, False
+        return _tipado(valores.asi8 // 1_000_000 * 1.0), True
+    if valores.dtype.kind == "M":
+        if np.isnat(valores).any():
+            return None, False
+        return _tipado(valores.astype("datetime64[ms]").astype("int64").astype("float64")), True
+    if valores.dtype.kind in "iu" and valores.dtype.name not in TIPOS:
+        # Inteiros de 64 bits viram int32 quando cabem, senão float64
+        cabe = np.iinfo(np.int32).min <= valores.min() and valores.max() <= np.iinfo(np.int32).max
+        valores = valores.astype("int32" if cabe else "float64")
+    if valores.dtype.name not in TIPOS:
+        return None, False
+    return _tipado(np.ascontiguousarray(valores)), False
+
+
+# Troca os arrays dos traços de um dicionário de figura por arrays tipados
+def codificar_figura(figura):
+    eixos_data = set()
+    for traco in figura.get("data", []):
+        for campo in CAMPOS:
+            tipado, datas = codificar(traco.get(campo))
+            if tipado is None:
+                continue
+            traco[campo] = tipado
+            if datas:
+                eixo = traco.get(f"{campo}axis", campo)
+                eixos_data.add(f"{campo}axis{eixo[1:]}")
+    # Números num eixo sem tipo seriam desenhados como números, não como datas
+    layout = figura.setdefault("layout", {})
+    for eixo in eixos_data:
+        layout.setdefault(eixo, {}).setdefault("type", "date")
+    return figura
+
+
+class FiguraBinaria(go.Figure):
+    def to_dict(self):
+        return codificar_figura(super().to_dict())
+
+
+# Mesma figura, enviada com arrays tipados
+def compactar(figura):
+    return FiguraBinaria(figura)
@@ -0,0 +1,44 @@
+# Gerador de dados sintéticos com o mesmo esquema do relatório de construções
+# Usado pelo benchmark para medir a dashboard com 100 mil, 1 milhão ou 10 milhões de linhas.
+# O arquivo é escrito em blocos, então a memória usada não depende do número de linhas.
+# Uso: python gerar_dados.py <linhas> <arquivo.csv> [semente]
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Eva"]
+SEXOS = ["F", "M"]
+REGIOES = ["Centro-Oeste", "Nordeste", "Norte", "Sudeste", "Sul"]
+PROJETOS = ["Comercial", "Industrial", "Infraestrutura", "Residencial"]
+DATAS = pd.date_range("2021-01-01", "2024-12-31", freq="D").strftime("%Y-%m-%d").to_numpy()
+
+# Linhas geradas e escritas por vez
+LINHAS_POR_BLOCO = 1_000_000
+
+
+def _bloco(rng, n):
+    return pd.DataFrame({"Data": rng.choice(DATAS, n),
+                         "Nome": rng.choice(NOMES, n),
+                         "Sexo": rng.choice(SEXOS, n),
+                         "Regiao": rng.choice(REGIOES, n),
+                         "Projeto": rng.choice(PROJETOS, n),
+                         "Funcionarios": rng.integers(5, 200, n),
+                         "Tempo_conclusao_dias": rng.integers(30, 900, n),
+                         "Custo_Reais": rng.uniform(1e4, 5e6, n).round(2)})
+
+
+# Gera "linhas" linhas no CSV; a mesma semente gera sempre o mesmo arquivo
+def gerar(linhas, caminho, semente=0, linhas_por_bloco=LINHAS_POR_BLOCO):
+    rng = np.random.default_rng(semente)
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        # Primeiro só o cabeçalho, depois os blocos
+        _bloco(rng, 0).to_csv(f, index=False)
+        for inicio in range(0, linhas, linhas_por_bloco):
+            _bloco(rng, min(linhas_por_bloco, linhas - inicio)).to_csv(f, index=False, header=False)
+    return caminho
+
+
+if __name__ == "__main__":
+    gerar(int(sys.argv[1]), sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 0)
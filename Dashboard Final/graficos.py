@@ -0,0 +1,214 @@
+# Construção das figuras Plotly da dashboard
+# Cada função recebe dados já filtrados e devolve uma figura pronta, sem chamar o Streamlit,
+# para que as figuras possam ser guardadas em cache e reaproveitadas. O plotly.express só é
+# importado quando um gráfico dele é construído (a importação leva mais de meio segundo), e não
+# antes de a página aparecer
+
+import plotly.graph_objects as go
+
+import cubo
+import estatisticas_box
+import reducao_pontos
+import tema
+
+# Paletas usadas pelos gráficos
+CORES_BARRAS = ["#33CFFF", "#00E0FF", "#88E0FF", "#00BFFF"]
+CORES_BOXPLOT = ["#33CFFF", "#88E0FF", "#00E0FF"]
+CORES_TENDENCIA = ["#33FF5F", "#00E0FF", "#FDFF88", "#4400FF"]
+
+# Traços com mais pontos que o limite são desenhados com WebGL (Scattergl), que aguenta séries
+# longas bem melhor que o SVG do Scatter; sem limite (None) ficam sempre em SVG
+def usar_webgl(pontos, limite_webgl):
+    return limite_webgl is not None and pontos > limite_webgl
+
+
+# Cria gráficos de linha simplificados usados nos cards de métricas
+def criar_sparkline(df, coluna_valor, coluna_data, cor="#00E0FF", limite_pontos=None, limite_webgl=None):
+    df_spark = df.groupby(coluna_data,
+                          observed=True,
+                          sort=True)[coluna_valor].sum().reset_index()
+    # Mantém só os pontos que fazem diferença na largura do card (LTTB preserva picos e vales)
+    df_spark = reducao_pontos.reduzir(df_spark, coluna_data, coluna_valor, limite_pontos, "lttb")
+
+    # Cria um gráfico de linha simples (sparkline) mostrando tendência
+    tipo = go.Scattergl if usar_webgl(len(df_spark), limite_webgl) else go.Scatter
+    fig = go.Figure(tipo(x=df_spark[coluna_data],
+                         y=df_spark[coluna_valor],
+                         mode='lines',
+                         line=dict(color=cor, width=2),
+                         fill='tozeroy'))
+
+    # Remove eixos e margens para um visual limpo
+    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0),
+                      xaxis=dict(showgrid=False, visible=False),
+                      yaxis=dict(showgrid=False, visible=False),
+                      paper_bgcolor='#123057', plot_bgcolor='#123057')
+
+    return fig
+
+
+# Cria o boxplot a partir dos quartis, cercas e outliers já calculados no servidor,
+# em vez de mandar todos os valores para o navegador calcular
+def criar_boxplot(resumos, cores, limite_webgl=None):
+    fig = go.Figure()
+    for i, (projeto, resumo) in enumerate(resumos.items()):
+        cor = cores[i % len(cores)]
+        fig.add_trace(go.Box(x=[projeto],
+                             q1=[resumo["q1"]],
+                             median=[resumo["mediana"]],
+                             q3=[resumo["q3"]],
+                             lowerfence=[resumo["cerca_inferior"]],
+                             upperfence=[resumo["cerca_superior"]],
+                             mean=[resumo["media"]],
+                             name=projeto,
+                             legendgroup=projeto,
+                             marker_color=cor))
+        # Os outliers (amostra limitada e reprodutível) entram como pontos por cima da caixa
+        if resumo["outliers"]:
+            tipo = go.Scattergl if usar_webgl(len(resumo["outliers"]), limite_webgl) else go.Scatter
+            fig.add_trace(tipo(x=[projeto] * len(resumo["outliers"]),
+                               y=resumo["outliers"],
+                               mode="markers",
+                               name=projeto,
+                               legendgroup=projeto,
+                               showlegend=False,
+                               marker=dict(color=cor, size=5)))
+    return fig
+
+
+# Aplica o layout escuro e mantém o padrão visual da dashboard
+def aplicar_dark_layout(fig):
+    fig.update_layout(paper_bgcolor="#0B1F3A",
+                      plot_bgcolor="#0B1F3A",
+                      font_color="#F3F5F7",
+                      title_font_color="#00E0FF",
+                      legend=dict(font=dict(color="#F3F5F7")),
+                      xaxis=dict(color="#F3F5F7", gridcolor="#1A3B60"),
+                      yaxis=dict(color="#F3F5F7", gridcolor="#1A3B60"))
+    return fig
+
+
+# Gráfico de barras: custo total por tipo de projeto
+def criar_grafico_custo_total(df_cubo):
+    import plotly.express as px
+
+    fig = px.bar(df_cubo.groupby("Projeto", observed=True)["Custo_Reais"].sum().reset_index(),
+                 x="Projeto",
+                 y="Custo_Reais",
+                 color="Projeto",
+                 labels={"Custo_Reais": "Custos"},
+                 text_auto=True,
+                 color_discrete_sequence=CORES_BARRAS,
+                 title="💰 Custo Total por Tipo de Projeto")
+    return aplicar_dark_layout(fig)
+
+
+# Gráfico de barras: custo médio por tipo de projeto
+def criar_grafico_custo_medio(df_cubo):
+    import plotly.express as px
+
+    fig = px.bar(cubo.media_por(df_cubo, "Projeto", "Custo_Reais"),
+                 x="Projeto",
+                 y="Custo_Reais",
+                 color="Projeto",
+                 labels={"Custo_Reais": "Média de Custos"},
+                 text_auto=True,
+                 color_discrete_sequence=CORES_BARRAS,
+                 title="💰 Custo Médio por Tipo de Projeto")
+    return aplicar_dark_layout(fig)
+
+
+# Boxplot mostrando a variação no número de funcionários por projeto
+# (montado a partir do histograma, então o tamanho não depende do número de linhas)
+def criar_grafico_funcionarios(df_hist, limite_webgl=None):
+    fig = criar_boxplot(estatisticas_box.resumo_por_projeto(df_hist), CORES_BOXPLOT, limite_webgl)
+    fig.update_layout(title="👷 Distribuição de Funcionários por Tipo de Projeto",
+                      xaxis_title="Projeto",
+                      yaxis_title="Funcionários",
+                      legend_title_text="Projeto")
+    return aplicar_dark_layout(fig)
+
+
+# Gráfico de pizza mostrando a proporção de custos por região
+def criar_grafico_regioes(df_cubo):
+    import plotly.express as px
+
+    fig = px.pie(df_cubo,
+                 names="Regiao",
+                 values="Custo_Reais",
+                 hole=0.4,
+                 color_discrete_sequence=px.colors.sequential.Reds,
+                 labels={"Custo_Reais": "Custos"},
+                 title="🌎 Proporção dos Custos por Região")
+    return aplicar_dark_layout(fig)
+
+
+# Dados do gráfico de tendência: o cubo da granularidade escolhida somado por projeto e data,
+# então o eixo y é sempre o custo total do projeto no período (dia, semana, mês ou trimestre),
+# em qualquer backend e modo de ingestão
+def dados_tendencia(df_cubo):
+    return df_cubo.groupby(["Projeto", "Data"], observed=True)["Custo_Reais"].sum().reset_index()
+
+
+# Gráfico de linha para acompanhar a evolução dos custos ao longo do tempo
+def criar_grafico_tendencia(df_tendencia, limite_pontos=None, limite_webgl=None):
+    import plotly.express as px
+
+    # Reduz cada projeto à quantidade de pontos que cabe na largura do gráfico,
+    # mantendo o menor e o maior custo de cada faixa de pixels
+    df_tendencia = reducao_pontos.reduzir_tendencia(df_tendencia, limite_pontos)
+    fig = px.line(df_tendencia,
+                  x="Data",
+                  y="Custo_Reais",
+                  color="Projeto",
+                  labels={"Custo_Reais": "Custos"},
+                  markers=True,
+                  color_discrete_sequence=CORES_TENDENCIA,
+                  render_mode="webgl" if usar_webgl(len(df_tendencia), limite_webgl) else "svg",
+                  title="📅 Tendência de Custos por Projeto")
+    aplicar_dark_layout(fig)
+    # Aumenta a espessura das linhas para melhor visualização
+    fig.update_traces(line=dict(width=3))
+    return fig
+
+
+# Figuras da página para uma seleção (selecao.Selecao): nome -> (parâmetros próprios do gráfico,
+# função que lê da seleção os dados do gráfico, função que constrói a figura com esses dados).
+# Os dados são lidos antes, na thread de quem pede, e a construção pode rodar em outra thread
+# sem tocar na seleção. As séries temporais leem o cubo na granularidade escolhida, que também
+# entra nos parâmetros delas; os demais gráficos leem os totais
+def pedidos_figuras(selecao, granularidade, limite_sparkline, limite_grafico, limite_webgl):
+    # Todas as figuras usam o tema da dashboard, montado na primeira vez
+    tema.registrar()
+
+    def cubo_granularidade():
+        return selecao.cubo(granularidade)
+
+    def tendencia():
+        return dados_tendencia(selecao.cubo(granularidade))
+
+    return {
+        # Sparklines dos cards
+        "spark_custo": ((granularidade, limite_sparkline), cubo_granularidade,
+                        lambda df: criar_sparkline(df, "Custo_Reais", "Data", "#00E0FF",
+                                                   limite_sparkline, limite_webgl)),
+        "spark_medio": ((granularidade, limite_sparkline), cubo_granularidade,
+                        lambda df: criar_sparkline(df, "Custo_Reais", "Data", "#33CFFF",
+                                                   limite_sparkline, limite_webgl)),
+        "spark_funcionarios": ((granularidade, limite_sparkline), cubo_granularidade,
+                               lambda df: criar_sparkline(df, "Funcionarios", "Data", "#88E0FF",
+                                                          limite_sparkline, limite_webgl)),
+        "spark_tempo": ((granularidade, limite_sparkline), cubo_granularidade,
+                        lambda df: criar_sparkline(df, "Tempo_conclusao_dias", "Data", "#00BFFF",
+                                                   limite_sparkline, limite_webgl)),
+        # Gráficos de barras: custo total e custo médio por tipo de projeto
+        "fig1": ((), selecao.totais, criar_grafico_custo_total),
+        "fig2": ((), selecao.totais, criar_grafico_custo_medio),
+        # Boxplot mostrando a variação no número de funcionários por projeto
+        "fig3": ((), selecao.histograma, lambda df: criar_grafico_funcionarios(df, limite_webgl)),
+        # Gráfico de pizza mostrando a proporção de custos por região
+        "fig4": ((), selecao.totais, criar_grafico_regioes),
+        # Gráfico de linha com a evolução dos custos ao longo do tempo, no nível escolhido
+        "fig5": ((granularidade, limite_grafico), tendencia,
+                 lambda df: criar_grafico_tendencia(df, limite_grafico, limite_webgl)),
+    }
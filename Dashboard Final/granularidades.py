@@ -0,0 +1,80 @@
+# Agregações do cubo por semana, mês e trimestre
+# Montadas uma vez na carga (e de novo a cada atualização dos dados), a partir do cubo diário:
+# cada nível é o mesmo cubo com a Data trocada pelo início do período, então serve para os
+# mesmos gráficos e contas. Os gráficos de série temporal leem o nível escolhido na barra
+# lateral, e o custo de olhar vários anos por mês fica parecido com o de olhar um mês por dia
+
+import numpy as np
+import pandas as pd
+
+import cubo
+
+# Níveis disponíveis: rótulo exibido na barra lateral
+GRANULARIDADES = {"dia": "Dia",
+                  "semana": "Semana",
+                  "mes": "Mês",
+                  "trimestre": "Trimestre"}
+
+# Período do pandas de cada nível (semanas de segunda a domingo)
+FREQUENCIAS = {"semana": "W-SUN", "mes": "M", "trimestre": "Q"}
+
+
+# Início do período que contém cada data (ou uma data só)
+def inicio_periodo(datas, granularidade):
+    if granularidade == "dia":
+        return datas
+    if isinstance(datas, pd.Series):
+        return datas.dt.to_period(FREQUENCIAS[granularidade]).dt.start_time
+    return pd.Timestamp(datas).to_period(FREQUENCIAS[granularidade]).start_time
+
+
+def _inicio_proximo(data, granularidade):
+    if granularidade == "dia":
+        return data + pd.Timedelta(days=1)
+    return (pd.Timestamp(data).to_period(FREQUENCIAS[granularidade]) + 1).start_time
+
+
+# Reagrupa um cubo (diário ou de outro nível mais fino) no nível pedido
+def agrupar(df_cubo, granularidade):
+    if granularidade == "dia" or not len(df_cubo):
+        return df_cubo
+    base = df_cubo.copy()
+    base["Data"] = inicio_periodo(base["Data"], granularidade)
+    return cubo.finalizar(cubo.combinar([base]))
+
+
+# Todos os níveis de um cubo diário: {granularidade: cubo}
+def montar(df_cubo):
+    return {granularidade: agrupar(df_cubo, granularidade) for granularidade in GRANULARIDADES}
+
+
+# Linhas com inicio <= Data < fim de um cubo ordenado pela Data (busca binária, sem varrer o cubo)
+def _fatia(df_cubo, inicio, fim):
+    datas = df_cubo["Data"].to_numpy()
+    a, b = np.searchsorted(datas, [np.datetime64(inicio, "ns"), np.datetime64(fim, "ns")])
+    return df_cubo.iloc[a:b]
+
+
+# Cubo no nível pedido restrito ao intervalo de datas [inicio, fim] (inclusive). Os períodos
+# inteiros dentro do intervalo vêm prontos do nível; os das pontas, cortados pelo intervalo,
+# são reagrupados a partir do cubo diário, então o resultado é exato
+def recortar(cubo_dia, cubo_nivel, inicio, fim, granularidade):
+    inicio = pd.Timestamp(inicio)
+    fim = pd.Timestamp(fim) + pd.Timedelta(days=1)
+    if granularidade == "dia":
+        return _fatia(cubo_dia, inicio, fim)
+
+    # [primeiro, ultimo) cobre só os períodos inteiros
+    primeiro = inicio_periodo(inicio, granularidade)
+    if primeiro < inicio:
+        primeiro = _inicio_proximo(primeiro, granularidade)
+    ultimo = inicio_periodo(fim, granularidade)
+    if primeiro >= ultimo:
+        return agrupar(_fatia(cubo_dia, inicio, fim), granularidade)
+
+    meio = _fatia(cubo_nivel, primeiro, ultimo)
+    pontas = [_fatia(cubo_dia, inicio, primeiro), _fatia(cubo_dia, ultimo, fim)]
+    pontas = [agrupar(ponta, granularidade) for ponta in pontas if len(ponta)]
+    if not pontas:
+        return meio
+    return cubo.finalizar(pd.concat([meio] + pontas, ignore_index=True))
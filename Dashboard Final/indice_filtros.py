@@ -0,0 +1,92 @@
+# Índice de filtros da barra lateral
+# Montado uma vez na carga: as linhas são ordenadas pela chave (Regiao, Projeto, Ano) e cada
+# combinação vira uma faixa contínua de posições. Um filtro passa a ser a união das faixas das
+# combinações selecionadas, sem varrer as colunas inteiras a cada rerun
+
+import numpy as np
+import pandas as pd
+
+# Dimensões usadas pelos filtros da barra lateral
+DIMENSOES_FILTRO = ["Regiao", "Projeto", "Ano"]
+
+
+def _anos(df):
+    # O cubo já tem a coluna Ano; nas linhas brutas ela é derivada da Data
+    if "Ano" in df.columns:
+        return df["Ano"]
+    return df["Data"].dt.year
+
+
+# Monta o índice de um DataFrame (linhas brutas ou cubo)
+def construir(df):
+    colunas = {"Regiao": df["Regiao"], "Projeto": df["Projeto"], "Ano": _anos(df)}
+    codigos = {}
+    valores = {}
+    for dimensao, serie in colunas.items():
+        codigos[dimensao], valores[dimensao] = pd.factorize(serie, sort=True)
+    tamanhos = [len(valores[d]) for d in DIMENSOES_FILTRO]
+
+    # Combina os três códigos em uma única chave; linhas com algum valor vazio
+    # ficam com a chave -1 e nunca passam pelo filtro
+    chave = np.zeros(len(df), dtype=np.int64)
+    validas = np.ones(len(df), dtype=bool)
+    for dimensao, tamanho in zip(DIMENSOES_FILTRO, tamanhos):
+        chave = chave * tamanho + codigos[dimensao]
+        validas &= codigos[dimensao] >= 0
+    chave[~validas] = -1
+    if np.prod(tamanhos) < np.iinfo(np.int16).max:
+        # Com chaves de 16 bits a ordenação estável vira radix sort, em tempo linear
+        chave = chave.astype(np.int16)
+
+    # Ordenação estável: dentro de cada combinação as posições continuam crescentes
+    tipo = np.int32 if len(df) < np.iinfo(np.int32).max else np.int64
+    ordem = np.argsort(chave, kind="stable").astype(tipo)
+    chave_ordenada = chave[ordem]
+    mudou = np.ones(len(df), dtype=bool)
+    mudou[1:] = chave_ordenada[1:] != chave_ordenada[:-1]
+    inicios = np.flatnonzero(mudou)
+    fins = np.append(inicios[1:], len(df))
+    chaves_faixas = chave_ordenada[inicios].astype(np.int64)
+
+    # Desfaz a chave combinada para saber a qual (Regiao, Projeto, Ano) cada faixa pertence
+    validas = chaves_faixas >= 0
+    codigos_faixas = np.unravel_index(chaves_faixas[validas], tamanhos)
+    faixas = pd.DataFrame({dimensao: np.asarray(valores[dimensao])[codigo]
+                           for dimensao, codigo in zip(DIMENSOES_FILTRO, codigos_faixas)})
+    faixas["inicio"] = inicios[validas]
+    faixas["fim"] = fins[validas]
+
+    # Opções já ordenadas para os multiselects, calculadas uma única vez
+    opcoes = {dimensao: sorted(faixas[dimensao].unique()) for dimensao in DIMENSOES_FILTRO}
+    return {"ordem": ordem, "faixas": faixas, "opcoes": opcoes, "linhas": len(df)}
+
+
+# Devolve as posições (em ordem crescente) das linhas que passam pelo filtro,
+# ou None quando o filtro seleciona todas as linhas
+def posicoes(indice, regioes, projetos, anos):
+    faixas = indice["faixas"]
+    selecionadas = faixas[faixas["Regiao"].isin(regioes)
+                          & faixas["Projeto"].isin(projetos)
+                          & faixas["Ano"].isin(anos)]
+    # Todas as combinações selecionadas e nenhuma linha inválida: o filtro não remove nada
+    if len(selecionadas) == len(faixas) and (faixas["fim"] - faixas["inicio"]).sum() == indice["linhas"]:
+        return None
+
+    ordem = indice["ordem"]
+    pedacos = [ordem[inicio:fim] for inicio, fim in zip(selecionadas["inicio"], selecionadas["fim"])]
+    if not pedacos:
+        return ordem[:0]
+    # As faixas são disjuntas; basta juntar e reordenar para manter a ordem original das linhas
+    return np.sort(np.concatenate(pedacos))
+
+
+# Aplica o filtro da barra lateral usando o índice. "colunas" limita o resultado às colunas
+# que serão usadas: só elas são copiadas, e sem filtro nenhum o resultado aponta para os
+# mesmos arrays do df original
+def filtrar(df, indice, regioes, projetos, anos, colunas=None):
+    selecao = posicoes(indice, regioes, projetos, anos)
+    if colunas is None:
+        return df if selecao is None else df.take(selecao)
+    if selecao is None:
+        return pd.DataFrame({coluna: df[coluna] for coluna in colunas}, copy=False)
+    return df.iloc[selecao, df.columns.get_indexer(colunas)]
@@ -0,0 +1,79 @@
+# Ingestão em blocos (streaming) do relatório de construções
+# O CSV é lido em pedaços de tamanho limitado e cada pedaço vira resumos compactos;
+# a memória usada depende do tamanho do bloco e do número de grupos, não do tamanho do arquivo
+
+import pandas as pd
+
+import cubo
+import estatisticas_box
+from cache_colunar import COLUNAS
+
+# Colunas necessárias para o cubo; o Ano é derivado da Data e Nome e Sexo não são lidos
+COLUNAS_STREAMING = [c for c in COLUNAS if c in cubo.DIMENSOES + cubo.METRICAS]
+
+# O parse usa mais memória que o DataFrame final; esta folga compensa isso na estimativa
+FATOR_PARSE = 3
+
+# Linhas lidas para estimar quantos bytes cada linha ocupa
+LINHAS_AMOSTRA = 1000
+
+
+# Estima quantas linhas cabem em um bloco dentro do limite de memória
+def linhas_por_bloco(caminho, memoria_max_mb):
+    amostra = pd.read_csv(caminho, usecols=COLUNAS_STREAMING, nrows=LINHAS_AMOSTRA)
+    if amostra.empty:
+        return LINHAS_AMOSTRA
+    bytes_por_linha = amostra.memory_usage(deep=True).sum() / len(amostra) * FATOR_PARSE
+    return max(LINHAS_AMOSTRA, int(memoria_max_mb * 1024 * 1024 / bytes_por_linha))
+
+
+# Prepara um bloco bruto: converte a Data e remove linhas sem data válida
+def preparar_bloco(bloco):
+    bloco["Data"] = pd.to_datetime(bloco["Data"], errors="coerce")
+    return bloco.dropna(subset=["Data"])
+
+
+# Resumos montados durante a leitura: (agregar um bloco, combinar parciais, finalizar)
+RESUMOS = [(cubo.agregar, cubo.combinar, cubo.finalizar),
+           (estatisticas_box.histograma, estatisticas_box.combinar, estatisticas_box.finalizar)]
+
+
+# Lê o CSV em blocos e devolve apenas os resumos: o cubo de agregados por
+# (Regiao, Projeto, Ano, Data) e o histograma de funcionários do boxplot.
+# "fonte" é um trecho já aberto do arquivo; sem ela o arquivo inteiro é lido
+def agregar_csv_em_blocos(caminho, memoria_max_mb, fonte=None):
+    tamanho_bloco = linhas_por_bloco(caminho, memoria_max_mb)
+    acumulados = [None] * len(RESUMOS)
+    parciais = [[] for _ in RESUMOS]
+    linhas_parciais = [0] * len(RESUMOS)
+
+    leitor = pd.read_csv(caminho if fonte is None else fonte,
+                         usecols=COLUNAS_STREAMING,
+                         dtype={"Regiao": "category", "Projeto": "category"},
+                         chunksize=tamanho_bloco)
+    with leitor:
+        for bloco in leitor:
+            bloco = preparar_bloco(bloco)
+            for i, (agregar, combinar, _) in enumerate(RESUMOS):
+                parcial = agregar(bloco)
+                parciais[i].append(parcial)
+                linhas_parciais[i] += len(parcial)
+                # Consolida os parciais sempre que eles somam mais que um bloco,
+                # para que a lista não cresça junto com o arquivo
+                if linhas_parciais[i] >= tamanho_bloco:
+                    acumulados[i] = combinar(_com_acumulado(acumulados[i], parciais[i]))
+                    parciais[i] = []
+                    linhas_parciais[i] = 0
+
+    return tuple(finalizar(combinar(_com_acumulado(acumulados[i], parciais[i])))
+                 for i, (_, combinar, finalizar) in enumerate(RESUMOS))
+
+
+def _com_acumulado(acumulado, parciais):
+    return parciais if acumulado is None else [acumulado] + parciais
+
+
+# Junta aos resumos já existentes os resumos de um trecho novo do CSV (carga incremental)
+def anexar_resumos(antigos, novos):
+    return tuple(finalizar(combinar([antigo, novo]))
+                 for antigo, novo, (_, combinar, finalizar) in zip(antigos, novos, RESUMOS))
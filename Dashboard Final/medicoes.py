@@ -0,0 +1,214 @@
+# Medições de desempenho por etapa da dashboard
+# Cada etapa (carga, filtros, crescimento, montagem e envio de cada figura, nuvem de palavras)
+# roda dentro de medicoes.etapa(nome) ou de uma função marcada com @medicoes.medido(nome), que
+# anotam o tempo, as linhas processadas e, no nível "memoria", a memória alocada (tracemalloc).
+# As anotações vão para o medidor ativo na thread; sem medidor ativo, que é o padrão, a etapa
+# não mede nada e o custo fica em uma consulta a um atributo por etapa.
+# As medições aparecem no painel da barra lateral e podem ser gravadas em um log JSON (uma linha
+# por execução) e em um arquivo de texto no formato do Prometheus, com os totais por etapa
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Níveis de DASHBOARD_MEDICOES: "tempo" mede tempo e linhas; "memoria" também a memória
+# alocada, ao custo de deixar todas as alocações mais lentas enquanto o tracemalloc está ligado
+NIVEIS = ["desligado", "tempo", "memoria"]
+
+_local = threading.local()
+
+
+# Medições de uma execução do script (ou de uma carga dos dados), na ordem em que as etapas começaram.
+# Com memória, o tracemalloc conta as alocações de todas as threads do processo: com várias
+# sessões rodando ao mesmo tempo os números de memória de uma incluem as das outras
+class Medidor:
+    def __init__(self, memoria=False):
+        self.memoria = memoria
+        self.inicio = time.time()
+        self.registros = []
+        self._inicio_perf = time.perf_counter()
+        self._abertas = []
+        if memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    # Mede o bloco; o registro devolvido pode receber as linhas processadas ("linhas")
+    @contextlib.contextmanager
+    def etapa(self, nome, linhas=None):
+        registro = {"etapa": nome, "nivel": len(self._abertas), "segundos": None, "linhas": linhas}
+        self.registros.append(registro)
+        aberta = {"memoria_inicio": 0, "pico": 0}
+        if self.memoria:
+            aberta["memoria_inicio"], pico = tracemalloc.get_traced_memory()
+            # O pico é zerado a cada etapa; o da etapa de fora fica guardado para não se perder
+            self._subir_pico(pico)
+            tracemalloc.reset_peak()
+        self._abertas.append(aberta)
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro["segundos"] = time.perf_counter() - inicio
+            self._abertas.pop()
+            if self.memoria:
+                atual, pico = tracemalloc.get_traced_memory()
+                pico = max(pico, aberta["pico"])
+                registro["memoria_pico_bytes"] = pico - aberta["memoria_inicio"]
+                registro["memoria_liquida_bytes"] = atual - aberta["memoria_inicio"]
+                self._subir_pico(pico)
+
+    # Registra uma etapa medida em outro lugar (ex.: numa thread do pool), no nível atual
+    def anotar(self, nome, segundos, linhas=None):
+        self.registros.append({"etapa": nome, "nivel": len(self._abertas), "segundos": segundos, "linhas": linhas})
+
+    def _subir_pico(self, pico):
+        if self._abertas:
+            self._abertas[-1]["pico"] = max(self._abertas[-1]["pico"], pico)
+
+    # Resumo serializável da execução, para o painel e os arquivos
+    def resumo(self):
+        etapas = []
+        for registro in self.registros:
+            etapa = dict(registro)
+            if etapa["segundos"] is not None:
+                etapa["segundos"] = round(etapa["segundos"], 6)
+            etapas.append(etapa)
+        return {"inicio": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.inicio)),
+                "segundos_total": round(time.perf_counter() - self._inicio_perf, 6),
+                "etapas": etapas}
+
+
+# Medidor para o nível configurado, ou None com as medições desligadas
+def criar(nivel):
+    if nivel not in NIVEIS[1:]:
+        return None
+    return Medidor(memoria=nivel == "memoria")
+
+
+def atual():
+    return getattr(_local, "medidor", None)
+
+
+# Torna o medidor o ativo desta thread (None desliga as medições nela)
+def ativar(medidor):
+    _local.medidor = medidor
+
+
+# Usa o medidor só dentro do bloco, voltando ao anterior depois
+@contextlib.contextmanager
+def usando(medidor):
+    anterior = atual()
+    _local.medidor = medidor
+    try:
+        yield medidor
+    finally:
+        _local.medidor = anterior
+
+
+# Sem medidor ativo a etapa não mede nada; o registro é um dicionário novo a cada chamada,
+# porque quem chama pode anotar nele (as threads dos gráficos inclusive)
+def etapa(nome, linhas=None):
+    medidor = atual()
+    if medidor is None:
+        return contextlib.nullcontext({})
+    return medidor.etapa(nome, linhas)
+
+
+def anotar(nome, segundos, linhas=None):
+    medidor = atual()
+    if medidor is not None:
+        medidor.anotar(nome, segundos, linhas)
+
+
+# Linhas de um resultado tabular (DataFrame); outros resultados não têm linhas
+def contar_linhas(valor):
+    return len(valor) if hasattr(valor, "columns") else None
+
+
+# Decorador: mede cada chamada da função como uma etapa, com as linhas do resultado
+def medido(nome):
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            medidor = atual()
+            if medidor is None:
+                return funcao(*args, **kwargs)
+            with medidor.etapa(nome) as registro:
+                resultado = funcao(*args, **kwargs)
+                registro["linhas"] = contar_linhas(resultado)
+            return resultado
+        return medida
+    return decorar
+
+
+# Linhas do painel: etapas marcadas pelo nível, tempo em milissegundos, memória em MB e, nas
+# etapas que anotaram "bytes" (a serialização das figuras), o tamanho em KB
+def tabela(resumo):
+    linhas = []
+    for registro in resumo["etapas"]:
+        linha = {"etapa": "· " * registro["nivel"] + registro["etapa"],
+                 "ms": round((registro["segundos"] or 0) * 1000, 1),
+                 "linhas": registro["linhas"]}
+        if "memoria_pico_bytes" in registro:
+            linha["pico_mb"] = round(registro["memoria_pico_bytes"] / 1024 / 1024, 2)
+        if registro.get("bytes") is not None:
+            linha["kb"] = round(registro["bytes"] / 1024, 1)
+        linhas.append(linha)
+    return linhas
+
+
+# Totais das medições do processo, por etapa, e o último resumo de cada tipo ("execucao", "carga").
+# Cada registro também pode ir para um log JSON e um arquivo no formato texto do Prometheus
+class Totais:
+    def __init__(self, caminho_json="", caminho_prometheus=""):
+        self.caminho_json = caminho_json
+        self.caminho_prometheus = caminho_prometheus
+        self.ultimos = {}
+        self._etapas = {}
+        self._trava = threading.Lock()
+
+    def registrar(self, medidor, tipo):
+        resumo = dict(medidor.resumo(), tipo=tipo)
+        with self._trava:
+            self.ultimos[tipo] = resumo
+            for registro in resumo["etapas"]:
+                total = self._etapas.setdefault(registro["etapa"], {"execucoes": 0,
+                                                                    "segundos": 0.0,
+                                                                    "linhas": 0,
+                                                                    "bytes": 0,
+                                                                    "memoria_pico_bytes": 0})
+                total["execucoes"] += 1
+                total["segundos"] += registro["segundos"] or 0
+                total["linhas"] += registro["linhas"] or 0
+                total["bytes"] += registro.get("bytes") or 0
+                total["memoria_pico_bytes"] = max(total["memoria_pico_bytes"],
+                                                  registro.get("memoria_pico_bytes", 0))
+            if self.caminho_json:
+                with open(self.caminho_json, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(resumo, ensure_ascii=False) + "\n")
+            if self.caminho_prometheus:
+                self._gravar_prometheus()
+        return resumo
+
+    def texto_prometheus(self):
+        metricas = [("dashboard_etapa_execucoes_total", "counter", "execucoes", "Vezes que a etapa rodou"),
+                    ("dashboard_etapa_segundos_total", "counter", "segundos", "Tempo gasto na etapa"),
+                    ("dashboard_etapa_linhas_total", "counter", "linhas", "Linhas processadas na etapa"),
+                    ("dashboard_etapa_bytes_total", "counter", "bytes", "Bytes gerados na etapa (JSON das figuras)"),
+                    ("dashboard_etapa_memoria_pico_bytes", "gauge", "memoria_pico_bytes",
+                     "Maior pico de memória alocada na etapa")]
+        linhas = []
+        for nome, tipo, campo, ajuda in metricas:
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+            linhas += [f'{nome}{{etapa="{etapa}"}} {total[campo]}' for etapa, total in sorted(self._etapas.items())]
+        return "\n".join(linhas) + "\n"
+
+    # Grava em um temporário e troca de uma vez, para quem lê o arquivo nunca ver metade dele
+    def _gravar_prometheus(self):
+        temporario = f"{self.caminho_prometheus}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(self.texto_prometheus())
+        os.replace(temporario, self.caminho_prometheus)
@@ -0,0 +1,94 @@
+# Medição da partida a frio da dashboard
+# Roda a primeira execução da dashboard (AppTest do Streamlit) em processos novos, como a primeira
+# sessão depois de o servidor subir, e lê das medições por etapa quanto levaram as importações e
+# quanto tempo passou do início do script até os cards estarem na página ("primeira pintura").
+# Compara a mediana com o orçamento de partida e termina com erro quando ele é estourado, para
+# segurar a dashboard no orçamento. O Streamlit já está importado nos processos, como no servidor.
+# Uso: python medir_partida.py [--repeticoes 5] [--orcamento-ms 3000] [--saida partida.json]
+# Roda na pasta dos dados; as variáveis DASHBOARD_* valem também aqui
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from configuracao import ORCAMENTO_PARTIDA_MS
+
+SCRIPT_DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard_trabalho.py")
+
+# Etapas das medições lidas em cada partida
+ETAPAS = ["importacoes", "primeira_pintura"]
+
+
+# Roda a primeira execução neste processo e devolve os tempos (chamado pelo processo filho)
+def executar_partida(timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(SCRIPT_DASHBOARD, default_timeout=timeout)
+    at.run()
+    with open(os.environ["DASHBOARD_MEDICOES_JSON"], encoding="utf-8") as f:
+        resumos = [json.loads(linha) for linha in f]
+    execucao = next(resumo for resumo in resumos if resumo["tipo"] == "execucao")
+    tempos = {etapa["etapa"]: etapa["segundos"] for etapa in execucao["etapas"] if etapa["etapa"] in ETAPAS}
+    tempos["execucao_completa"] = execucao["segundos_total"]
+    tempos["erros"] = [str(e.value) for e in at.exception]
+    return tempos
+
+
+# Uma partida em um processo novo, com as medições ligadas e gravadas num arquivo temporário
+def rodar_processo(timeout):
+    with tempfile.TemporaryDirectory() as pasta:
+        ambiente = dict(os.environ,
+                        DASHBOARD_MEDICOES="tempo",
+                        DASHBOARD_MEDICOES_JSON=os.path.join(pasta, "medicoes.jsonl"),
+                        DASHBOARD_INTERVALO_ATUALIZACAO_S="0")
+        saida = subprocess.run([sys.executable, os.path.abspath(__file__), "--partida", "--timeout", str(timeout)],
+                               env=ambiente,
+                               capture_output=True,
+                               text=True)
+    if saida.returncode != 0:
+        raise RuntimeError(f"A partida falhou:\n{saida.stderr[-4000:]}")
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a partida a frio da dashboard e confere o orçamento")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--orcamento-ms", type=int, default=ORCAMENTO_PARTIDA_MS,
+                        help="tempo máximo até os cards aparecerem (padrão: DASHBOARD_ORCAMENTO_PARTIDA_MS)")
+    parser.add_argument("--saida", help="arquivo JSON do resultado (padrão: só imprime)")
+    parser.add_argument("--timeout", type=float, default=600, help="tempo máximo de cada partida, em segundos")
+    parser.add_argument("--partida", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.partida:
+        print(json.dumps(executar_partida(args.timeout)))
+        return
+
+    partidas = []
+    for repeticao in range(args.repeticoes):
+        partidas.append(rodar_processo(args.timeout))
+        print(f"Partida {repeticao + 1}: " + ", ".join(f"{etapa} {partidas[-1][etapa] * 1000:.0f} ms"
+                                                     for etapa in ETAPAS + ["execucao_completa"]), file=sys.stderr)
+    medianas = {etapa: statistics.median(p[etapa] for p in partidas) for etapa in ETAPAS + ["execucao_completa"]}
+    resultado = {"orcamento_ms": args.orcamento_ms,
+                 "mediana_ms": {etapa: round(segundos * 1000, 1) for etapa, segundos in medianas.items()},
+                 "dentro_do_orcamento": medianas["primeira_pintura"] * 1000 <= args.orcamento_ms,
+                 "partidas": partidas}
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+    if not resultado["dentro_do_orcamento"]:
+        print(f"Cards na página em {resultado['mediana_ms']['primeira_pintura']:.0f} ms (mediana), "
+              f"acima do orçamento de {args.orcamento_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Nuvem de palavras dos tipos de projeto
+# A nuvem é gerada direto das frequências (quantidade de linhas por projeto, tirada do cubo),
+# sem juntar e re-tokenizar um texto com uma palavra por linha. O WordCloud só é importado
+# quando a nuvem realmente precisa ser desenhada
+
+import io
+
+import cubo
+
+# Aparência da nuvem, igual à usada desde a primeira versão da dashboard
+OPCOES_NUVEM = dict(width=800,
+                    height=300,
+                    background_color="#0B1F3A",
+                    colormap="Blues",
+                    prefer_horizontal=0.9,
+                    max_words=80,
+                    collocations=False,
+                    contour_color="#00E0FF",
+                    contour_width=2)
+
+
+# Quantidade de linhas de cada tipo de projeto no cubo filtrado
+def frequencias(df_cubo):
+    contagens = df_cubo.groupby("Projeto", observed=True)[cubo.LINHAS].sum()
+    return {str(projeto): int(qtd) for projeto, qtd in contagens.items() if qtd > 0}
+
+
+# Desenha a nuvem e devolve a imagem em PNG, pronta para o st.image e para o cache
+def gerar_png(frequencias):
+    from wordcloud import WordCloud
+
+    imagem = WordCloud(**OPCOES_NUVEM).generate_from_frequencies(frequencias).to_image()
+    buffer = io.BytesIO()
+    imagem.save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -0,0 +1,239 @@
+# Dados particionados por ano e mês
+# CAMINHO_DADOS também pode ser uma pasta com um CSV por mês, organizada como
+# <pasta>/<ano>/<mes>.csv (ou <pasta>/<ano>/<mes>/*.csv). Um manifesto guarda, para cada
+# partição, as datas mínima e máxima, os anos e os valores distintos de Regiao e Projeto;
+# com ele os filtros da barra lateral escolhem só as partições que podem ter linhas
+# selecionadas (e, com um período, só as que têm datas dentro dele), e só essas são
+# carregadas, em paralelo. Com a prévia ligada, o manifesto guarda
+# também a amostra estratificada (amostra.py) e o tamanho dos estratos de cada partição, para
+# estimar os cards antes de carregar as partições
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import amostra
+import cubo
+import estatisticas_box
+from cache_colunar import PASTA_CACHE
+
+# Versão do formato do manifesto: mudar aqui faz todas as partições serem examinadas de novo
+VERSAO_MANIFESTO = 1
+
+# Nome das pastas de ano
+PADRAO_ANO = re.compile(r"^\d{4}$")
+
+# Bytes de CSV carregados por segundo, usados para prever a carga das partições enquanto
+# nenhuma carga foi medida (partições de um mês, de uns 100 KB, ficam perto disso num núcleo)
+BYTES_POR_SEGUNDO_CARGA = 1024 * 1024
+
+
+# Lista os CSVs das partições, em ordem de ano e mês (caminhos relativos à pasta)
+def listar_particoes(pasta):
+    particoes = []
+    for ano in sorted(os.listdir(pasta)):
+        caminho_ano = os.path.join(pasta, ano)
+        if not (PADRAO_ANO.match(ano) and os.path.isdir(caminho_ano)):
+            continue
+        for raiz, subpastas, arquivos in os.walk(caminho_ano):
+            subpastas[:] = sorted(p for p in subpastas if p != PASTA_CACHE)
+            particoes += [os.path.relpath(os.path.join(raiz, a), pasta) for a in sorted(arquivos) if a.endswith(".csv")]
+    return particoes
+
+
+# Identifica a versão da pasta: tamanho e data de modificação de cada partição
+def impressao_digital(pasta):
+    digital = {}
+    for particao in listar_particoes(pasta):
+        info = os.stat(os.path.join(pasta, particao))
+        digital[particao] = [info.st_size, info.st_mtime_ns]
+    return digital
+
+
+# Resume uma partição para o manifesto, lendo só as colunas usadas na poda (e as métricas,
+# com a prévia ligada: a amostra da partição e as linhas de cada estrato vão junto)
+def _resumir(caminho, fracao_previa):
+    df = pd.read_csv(caminho, usecols=["Data", "Regiao", "Projeto"] + (cubo.METRICAS if fracao_previa > 0 else []))
+    df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
+    df = df.dropna(subset=["Data"])
+    resumo = {"linhas": len(df),
+              "data_min": str(df["Data"].min()) if len(df) else None,
+              "data_max": str(df["Data"].max()) if len(df) else None,
+              "anos": sorted(int(a) for a in df["Data"].dt.year.unique()),
+              "Regiao": sorted(df["Regiao"].dropna().astype(str).unique()),
+              "Projeto": sorted(df["Projeto"].dropna().astype(str).unique()),
+              "fracao_previa": fracao_previa}
+    if fracao_previa > 0:
+        sorteadas = amostra.agregar(df, fracao_previa)
+        resumo["amostra"] = {coluna: sorteadas[coluna].tolist() for coluna in amostra.COLUNAS}
+        estratos = df.groupby(["Regiao", "Projeto", df["Data"].dt.year.rename("Ano")]).size()
+        resumo["estratos"] = [[regiao, projeto, int(ano), int(n)] for (regiao, projeto, ano), n in estratos.items()]
+    return resumo
+
+
+# Lê o manifesto salvo e examina (em paralelo) só as partições novas ou alteradas (ou
+# resumidas com outra fração da prévia)
+def carregar_manifesto(pasta, threads, fracao_previa=0):
+    caminho_manifesto = os.path.join(pasta, PASTA_CACHE, "manifesto.json")
+    try:
+        with open(caminho_manifesto, encoding="utf-8") as f:
+            salvo = json.load(f)
+    except (OSError, ValueError):
+        salvo = {}
+    anteriores = salvo.get("particoes", {}) if salvo.get("versao") == VERSAO_MANIFESTO else {}
+
+    manifesto = {}
+    faltando = []
+    for particao, (tamanho, mtime_ns) in impressao_digital(pasta).items():
+        entrada = anteriores.get(particao)
+        if (entrada and entrada["tamanho"] == tamanho and entrada["mtime_ns"] == mtime_ns
+                and entrada.get("fracao_previa") == fracao_previa):
+            manifesto[particao] = entrada
+        else:
+            manifesto[particao] = {"tamanho": tamanho, "mtime_ns": mtime_ns}
+            faltando.append(particao)
+
+    if faltando:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            resumos = executor.map(lambda p: _resumir(os.path.join(pasta, p), fracao_previa), faltando)
+            for particao, resumo in zip(faltando, resumos):
+                manifesto[particao].update(resumo)
+        try:
+            os.makedirs(os.path.dirname(caminho_manifesto), exist_ok=True)
+            temporario = f"{caminho_manifesto}.{os.getpid()}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump({"versao": VERSAO_MANIFESTO, "particoes": manifesto}, f)
+            os.replace(temporario, caminho_manifesto)
+        except OSError:
+            # Sem permissão de escrita: o manifesto é refeito na próxima carga
+            pass
+    return manifesto
+
+
+# Junta os pedaços vindos de partições diferentes; as categorias de cada uma podem ser
+# diferentes, então as colunas categóricas são refeitas depois de concatenar
+def _juntar_linhas(partes):
+    juntas = pd.concat(partes, ignore_index=True)
+    for coluna in partes[0].columns:
+        if isinstance(partes[0][coluna].dtype, pd.CategoricalDtype):
+            juntas[coluna] = juntas[coluna].astype("category")
+    return juntas
+
+
+# Consultas sobre uma pasta particionada; mesma interface de consultas.ConsultasPandas.
+# "carregar(caminho)" devolve as consultas de uma partição (um CSV) e só é chamada para as
+# partições que algum filtro precisou. "fracao_previa" > 0 liga a amostra da prévia
+class ConsultasParticionadas:
+    def __init__(self, pasta, carregar, threads, fracao_previa=0):
+        self.pasta = pasta
+        self.threads = threads
+        self.fracao_previa = fracao_previa
+        self.manifesto = carregar_manifesto(pasta, threads, fracao_previa)
+        self._carregar = carregar
+        self._carregadas = {}
+        self._bytes_por_segundo = BYTES_POR_SEGUNDO_CARGA
+        self._trava = threading.Lock()
+
+    def opcoes(self):
+        entradas = [e for e in self.manifesto.values() if e["linhas"]]
+        return {"Regiao": sorted({r for e in entradas for r in e["Regiao"]}),
+                "Projeto": sorted({p for e in entradas for p in e["Projeto"]}),
+                "Ano": sorted({a for e in entradas for a in e["anos"]})}
+
+    # Poda: partições com algum ano selecionado e alguma Regiao e algum Projeto selecionados e,
+    # com o período [inicio, fim] (datas, inclusive), cujas datas [data_min, data_max] o tocam
+    def selecionar(self, regioes, projetos, anos, inicio=None, fim=None):
+        regioes, projetos, anos = set(map(str, regioes)), set(map(str, projetos)), set(map(int, anos))
+        selecionadas = [particao for particao, e in self.manifesto.items()
+                        if e["linhas"] and anos & set(e["anos"]) and regioes & set(e["Regiao"])
+                        and projetos & set(e["Projeto"])]
+        if inicio is None:
+            return selecionadas
+        inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim) + pd.Timedelta(days=1)
+        return [particao for particao in selecionadas
+                if pd.Timestamp(self.manifesto[particao]["data_max"]) >= inicio
+                and pd.Timestamp(self.manifesto[particao]["data_min"]) < fim]
+
+    # Consultas das partições selecionadas; as que ainda não foram usadas são carregadas em
+    # paralelo (uma carga por vez, para que sessões simultâneas não leiam a mesma partição duas vezes)
+    def _particoes(self, regioes, projetos, anos, inicio=None, fim=None):
+        selecionadas = self.selecionar(regioes, projetos, anos, inicio, fim)
+        with self._trava:
+            faltando = [p for p in selecionadas if p not in self._carregadas]
+            if faltando:
+                inicio = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                    carregadas = executor.map(lambda p: self._carregar(os.path.join(self.pasta, p)), faltando)
+                    self._carregadas.update(zip(faltando, carregadas))
+                self._bytes_por_segundo = (sum(self.manifesto[p]["tamanho"] for p in faltando)
+                                           / max(time.perf_counter() - inicio, 1e-6))
+        return [self._carregadas[p] for p in selecionadas]
+
+    # Carrega de uma vez as partições que os filtros vão pedir (o exportador de relatórios chama
+    # antes de criar os processos, que herdam as partições já carregadas)
+    def preparar(self, regioes, projetos, anos):
+        self._particoes(regioes, projetos, anos)
+
+    # Primeira e última data, pelo manifesto (sem carregar nenhuma partição)
+    def periodo(self):
+        datas = [(e["data_min"], e["data_max"]) for e in self.manifesto.values() if e["linhas"]]
+        if not datas:
+            return None, None
+        return pd.Timestamp(min(d[0] for d in datas)), pd.Timestamp(max(d[1] for d in datas))
+
+    # Com o período, só as partições que o tocam: os períodos (semana, mês, trimestre) que
+    # granularidades.recortar lê inteiros estão dentro dele, então nenhuma parte deles fica de fora
+    def cubo(self, regioes, projetos, anos, granularidade="dia", inicio=None, fim=None):
+        partes = [c.cubo(regioes, projetos, anos, granularidade)
+                  for c in self._particoes(regioes, projetos, anos, inicio, fim)]
+        juntos = pd.concat(partes, ignore_index=True) if partes else cubo.combinar([])
+        # Uma semana ou um trimestre pode começar numa partição (mês) e terminar em outra
+        if granularidade != "dia" and len(juntos):
+            juntos = cubo.combinar([juntos])
+        return cubo.finalizar(juntos)
+
+    # O boxplot não tem a Data e segue o período pelos anos (como nos outros backends), então
+    # aqui não há poda por datas
+    def histograma(self, regioes, projetos, anos):
+        partes = [c.histograma(regioes, projetos, anos) for c in self._particoes(regioes, projetos, anos)]
+        return estatisticas_box.finalizar(pd.concat(partes, ignore_index=True) if partes
+                                          else estatisticas_box.combinar([]))
+
+    # Quanto se espera que o cubo filtrado demore: a carga das partições selecionadas que ainda
+    # não estão em memória, no ritmo da última carga (o cubo das já carregadas sai na hora)
+    def segundos_previstos(self, regioes, projetos, anos):
+        faltando = [p for p in self.selecionar(regioes, projetos, anos) if p not in self._carregadas]
+        return sum(self.manifesto[p]["tamanho"] for p in faltando) / self._bytes_por_segundo
+
+    # Amostra filtrada para a prévia dos cards, montada só com o manifesto (sem carregar
+    # nenhuma partição): as amostras das partições selecionadas se juntam como as de blocos
+    def amostra(self, regioes, projetos, anos):
+        if self.fracao_previa <= 0:
+            return None
+        entradas = [self.manifesto[p] for p in self.selecionar(regioes, projetos, anos)]
+        sorteadas = amostra.finalizar(amostra.combinar([pd.DataFrame(e["amostra"], columns=amostra.COLUNAS)
+                                                        for e in entradas], self.fracao_previa))
+        sorteadas = sorteadas[sorteadas["Regiao"].isin(list(map(str, regioes)))
+                              & sorteadas["Projeto"].isin(list(map(str, projetos)))
+                              & sorteadas["Ano"].isin(list(map(int, anos)))].reset_index(drop=True)
+        estratos = pd.DataFrame([estrato for e in entradas for estrato in e["estratos"]],
+                                columns=amostra.DIMENSOES + [cubo.LINHAS])
+        return amostra.com_estratos(sorteadas, estratos)
+
+    # Linhas brutas filtradas, partição por partição (None no modo streaming)
+    def linhas(self, regioes, projetos, anos, colunas=None):
+        partes = [c.linhas(regioes, projetos, anos, colunas) for c in self._particoes(regioes, projetos, anos)]
+        if any(parte is None for parte in partes):
+            return None
+        if not partes:
+            return pd.DataFrame(columns=colunas)
+        return _juntar_linhas(partes)
+
+    # Quantas partições já foram carregadas, do total
+    def estatisticas(self):
+        return {"carregadas": len(self._carregadas), "total": len(self.manifesto)}
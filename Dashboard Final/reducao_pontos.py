@@ -0,0 +1,87 @@
+# Redução de pontos (downsampling) das séries enviadas ao navegador
+# Um gráfico não consegue mostrar mais pontos do que tem de pixels na horizontal; estas funções
+# escolhem quais pontos manter preservando o formato da série, inclusive picos e vales
+
+import numpy as np
+import pandas as pd
+
+
+# Converte a coluna do eixo x (datas ou números) para float, para as contas de área e de faixas
+def _eixo_numerico(x):
+    x = pd.Series(x)
+    if pd.api.types.is_datetime64_any_dtype(x):
+        return x.to_numpy(dtype="datetime64[ns]").view("int64").astype("float64")
+    return x.to_numpy(dtype="float64")
+
+
+# Largest-Triangle-Three-Buckets: mantém o ponto de cada faixa que forma o maior triângulo
+# com o ponto escolhido na faixa anterior e a média da faixa seguinte
+def indices_lttb(x, y, limite):
+    n = len(y)
+    if limite >= n or limite < 3:
+        return np.arange(n)
+    x = _eixo_numerico(x)
+    y = np.asarray(y, dtype="float64")
+
+    # O primeiro e o último ponto ficam sempre; o resto é dividido em limite - 2 faixas
+    limites = np.linspace(1, n - 1, limite - 1).astype(np.int64)
+    escolhidos = np.empty(limite, dtype=np.int64)
+    escolhidos[0] = 0
+    escolhidos[-1] = n - 1
+    anterior = 0
+    for faixa in range(limite - 2):
+        inicio, fim = limites[faixa], limites[faixa + 1]
+        prox_inicio, prox_fim = fim, limites[faixa + 2] if faixa + 2 < len(limites) else n
+        media_x = x[prox_inicio:prox_fim].mean()
+        media_y = y[prox_inicio:prox_fim].mean()
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.nanargmax(areas)) if np.isfinite(areas).any() else inicio
+        escolhidos[faixa + 1] = anterior
+    return escolhidos
+
+
+# Min/max por faixa de pixel: divide o eixo x em faixas de mesma largura e mantém
+# o menor e o maior valor de cada uma, então nenhum pico ou vale some
+def indices_min_max(x, y, limite):
+    n = len(y)
+    if limite >= n or limite < 4:
+        return np.arange(n)
+    eixo = _eixo_numerico(x)
+    # Cada faixa contribui com até dois pontos, e as pontas da série são mantidas à parte
+    faixas = (limite - 2) // 2
+    amplitude = eixo[-1] - eixo[0]
+    if amplitude <= 0:
+        faixa = np.zeros(n, dtype=np.int64)
+    else:
+        faixa = np.minimum(((eixo - eixo[0]) / amplitude * faixas).astype(np.int64), faixas - 1)
+
+    valores = pd.Series(np.asarray(y, dtype="float64"))
+    grupos = valores.groupby(faixa, sort=False)
+    escolhidos = np.concatenate([grupos.idxmin().dropna().to_numpy(dtype=np.int64),
+                                 grupos.idxmax().dropna().to_numpy(dtype=np.int64),
+                                 [0, n - 1]])
+    return np.unique(escolhidos)
+
+
+METODOS = {"lttb": indices_lttb, "min_max": indices_min_max}
+
+
+# Reduz um DataFrame ordenado pelo eixo x a no máximo "limite" pontos por série
+# (uma série por valor de "grupo", quando informado); limite None mantém tudo
+def reduzir(df, coluna_x, coluna_y, limite, metodo="lttb", grupo=None):
+    if limite is None or len(df) <= limite:
+        return df
+    selecionar = METODOS[metodo]
+    if grupo is None:
+        return df.iloc[selecionar(df[coluna_x], df[coluna_y], limite)]
+    partes = []
+    for _, serie in df.groupby(grupo, observed=True, sort=False):
+        partes.append(serie.iloc[selecionar(serie[coluna_x], serie[coluna_y], limite)])
+    return pd.concat(partes) if partes else df
+
+
+# Pontos do gráfico de tendência: a série de cada projeto ordenada pela Data e reduzida pelo
+# min/max a "limite" pontos por projeto
+def reduzir_tendencia(df, limite):
+    return reduzir(df.sort_values("Data", kind="stable"), "Data", "Custo_Reais", limite, "min_max", grupo="Projeto")
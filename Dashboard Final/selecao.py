@@ -0,0 +1,81 @@
+# Seleção dos filtros da barra lateral aplicada às consultas
+# Junta regiões, projetos, anos e o intervalo de datas e devolve o que os cards e os gráficos
+# leem: o cubo em cada granularidade e o histograma do boxplot, cada um calculado no máximo uma
+# vez por seleção. Não depende do Streamlit: a dashboard monta uma
+# seleção por execução e o exportador de relatórios uma por preset
+
+import crescimento
+import cubo
+import granularidades
+import medicoes
+
+# Cards, barras, pizza e nuvem só somam por Projeto e Regiao, sem olhar a Data: leem o nível
+# mais grosso, com o mesmo resultado do cubo diário e bem menos grupos
+NIVEL_TOTAIS = "trimestre"
+
+
+class Selecao:
+    # "inicio" e "fim" (datas, inclusive) limitam o período; None é o período todo dos dados
+    def __init__(self, consultas, regioes, projetos, anos, inicio=None, fim=None):
+        self.consultas = consultas
+        self.regioes = regioes
+        self.projetos = projetos
+        self.anos = anos
+        data_min, data_max = consultas.periodo()
+        if data_min is not None:
+            data_min, data_max = data_min.date(), data_max.date()
+        self.inicio = data_min if inicio is None else inicio
+        self.fim = data_max if fim is None else fim
+        self.periodo_completo = (self.inicio, self.fim) == (data_min, data_max)
+        # Período passado às consultas: (None, None) é tudo
+        self.periodo = (None, None) if self.periodo_completo else (self.inicio, self.fim)
+        # Anos selecionados que têm alguma data dentro do intervalo: filtram o cubo (e, com
+        # partições, evitam carregar as de fora do intervalo) e o boxplot, que não tem a Data
+        # e fica por ano
+        self.anos_periodo = anos if self.periodo_completo else [ano for ano in anos
+                                                                if self.inicio.year <= ano <= self.fim.year]
+        self._cubos = {}
+        self._histograma = None
+
+    # Filtros que identificam a seleção, para as chaves dos caches
+    def chave(self):
+        return (self.regioes, self.projetos, self.anos, self.inicio, self.fim)
+
+    # Cubo filtrado no nível pedido e recortado no intervalo de datas; no pandas o índice junta
+    # as faixas de linhas das combinações selecionadas em vez de varrer as colunas, no SQLite
+    # o filtro vira uma consulta indexada e, com partições, as de fora do intervalo não são lidas
+    def cubo(self, nivel="dia"):
+        if nivel not in self._cubos:
+            with medicoes.etapa(f"filtro_cubo_{nivel}") as registro:
+                df_nivel = self.consultas.cubo(self.regioes, self.projetos, self.anos_periodo, nivel, *self.periodo)
+                if not self.periodo_completo:
+                    cubo_dia = df_nivel if nivel == "dia" else self.consultas.cubo(self.regioes, self.projetos,
+                                                                                   self.anos_periodo, "dia",
+                                                                                   *self.periodo)
+                    df_nivel = granularidades.recortar(cubo_dia, df_nivel, self.inicio, self.fim, nivel)
+                registro["linhas"] = len(df_nivel)
+            self._cubos[nivel] = df_nivel
+        return self._cubos[nivel]
+
+    def totais(self):
+        return self.cubo(NIVEL_TOTAIS)
+
+    def histograma(self):
+        if self._histograma is None:
+            with medicoes.etapa("filtro_histograma") as registro:
+                self._histograma = self.consultas.histograma(self.regioes, self.projetos, self.anos_periodo)
+                registro["linhas"] = len(self._histograma)
+        return self._histograma
+
+    # Valores dos cards; o crescimento entre os dois períodos mais recentes lê o nível do cubo
+    # da janela de comparação, para todas as métricas de uma vez
+    def cards(self, janela):
+        df_totais = self.totais()
+        valores = {"total_custo": df_totais["Custo_Reais"].sum(),
+                   "custo_medio": cubo.media(df_totais, "Custo_Reais"),
+                   "media_funcionarios": cubo.media(df_totais, "Funcionarios"),
+                   "media_tempo": cubo.media(df_totais, "Tempo_conclusao_dias")}
+        df_janela = self.cubo(crescimento.NIVEIS[janela])
+        with medicoes.etapa("crescimento", len(df_janela)):
+            valores["crescimentos"] = crescimento.calcular_crescimentos(df_janela, janela)
+        return valores
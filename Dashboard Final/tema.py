@@ -0,0 +1,102 @@
+# Tema visual da dashboard
+# O tema escuro dos gráficos Plotly, o CSS e o HTML dos cards de métricas, usados pela página do
+# Streamlit e pelos relatórios estáticos do exportador, para que os dois tenham a mesma aparência
+
+import threading
+
+_trava = threading.Lock()
+_registrado = False
+
+
+# Cria um tema escuro personalizado chamado "construcao_dark" e o define como padrão. Montar o
+# tema a partir do "plotly_dark" valida todos os atributos (uns 200 ms), então isso só acontece
+# na primeira figura do processo, e não antes da página aparecer; as chamadas seguintes não fazem nada
+def registrar():
+    global _registrado
+    with _trava:
+        if _registrado:
+            return
+        import plotly.io as pio
+
+        pio.templates["construcao_dark"] = pio.templates["plotly_dark"]
+        pio.templates["construcao_dark"].layout.update(
+            font=dict(family="Segoe UI,sans-serif",
+                      size=14,
+                      color="#F3F5F7"),
+            title=dict(x=0.5,
+                       font=dict(size=22, color="#00E0FF")), # centraliza o título
+            paper_bgcolor="#0B1F3A", # fundo da área total
+            plot_bgcolor="#0B1F3A",) # fundo da área de plotagem
+        pio.templates.default = "construcao_dark" # define esse tema como padrão
+        _registrado = True
+
+# Estilos HTML e CSS que personalizam a aparência da interface
+ESTILO = """
+<style>
+.stApp {background-color: #0B1F3A; color: #F3F5F7; font-family: 'Segoe UI', sans-serif;}
+h1 {color: #00E0FF; text-align: center; margin-bottom: 0.3em; font-weight: 700;}
+.metric-card {background: #123057; padding: 20px; border-radius: 18px; box-shadow: 0 6px 18px rgba(0,0,0,0.5); text-align: center; transition: transform 0.3s, box-shadow 0.3s;}
+.metric-card:hover {transform: translateY(-6px); box-shadow: 0 12px 25px rgba(0,0,0,0.7);}
+.metric-icon {font-size: 40px; margin-bottom: 10px;}
+.metric-value {font-size: 28px; font-weight: 700; color: #00E0FF;}
+.metric-label {font-size: 16px; color: #F3F5F7;}
+.metric-change {font-size:14px; font-weight:600; margin-top:4px;}
+.metric-up {color:#00FF7F;}
+.metric-down {color:#FF4500;}
+.stSidebar .css-1d391kg {background-color: #123057; padding: 15px; border-radius: 15px;}
+.stSidebar h2, .stSidebar h3, .stSidebar label {color: #F3F5F7;}
+</style>
+"""
+
+
+# Valor em reais, com o separador de milhar convertido da vírgula (,) para o ponto (.)
+def _reais(valor):
+    return "R$ " + f"{valor:,.0f}".replace(',', '.')
+
+
+# Cards de métricas a partir dos valores calculados pela seleção: (ícone, rótulo, valor
+# formatado, crescimento em %, sparkline exibida abaixo do card)
+def cards_metricas(valores):
+    crescimentos = valores["crescimentos"]
+    return [("💰", "Custo Total", _reais(valores["total_custo"]), crescimentos["Custo_Reais"], "spark_custo"),
+            ("📊", "Custo Médio", _reais(valores["custo_medio"]), crescimentos["Custo_medio"], "spark_medio"),
+            ("👷", "Média de Funcionários", f'{valores["media_funcionarios"]:,.0f}', crescimentos["Funcionarios"],
+             "spark_funcionarios"),
+            ("⏱️", "Duração Média", f'{valores["media_tempo"]:,.0f} dias', crescimentos["Tempo_conclusao_dias"],
+             "spark_tempo")]
+
+
+# Cards da prévia a partir das estimativas da amostra (amostra.estimar), nos mesmos formatos
+# dos cards exatos: (ícone, rótulo, valor formatado, margem do intervalo de confiança formatada)
+def cards_previa(estimativa):
+    total, media = estimativa["total"], estimativa["media"]
+    return [("💰", "Custo Total", _reais(total["Custo_Reais"][0]), _reais(total["Custo_Reais"][1])),
+            ("📊", "Custo Médio", _reais(media["Custo_Reais"][0]), _reais(media["Custo_Reais"][1])),
+            ("👷", "Média de Funcionários", f'{media["Funcionarios"][0]:,.0f}', f'{media["Funcionarios"][1]:,.1f}'),
+            ("⏱️", "Duração Média", f'{media["Tempo_conclusao_dias"][0]:,.0f} dias',
+             f'{media["Tempo_conclusao_dias"][1]:,.1f} dias')]
+
+
+def _card(icone, rotulo, valor, classe, linha):
+    return f"""
+        <div class='metric-card'>
+            <div class='metric-icon'>{icone}</div>
+            <div class='metric-value'>{valor}</div>
+            <div class='metric-label'>{rotulo}</div>
+            <div class='metric-change {classe}'>
+                {linha}
+            </div>
+        </div>
+        """
+
+
+# HTML de um card de métrica, com a variação em verde (alta) ou vermelho (queda)
+def card_html(icone, rotulo, valor, variacao):
+    return _card(icone, rotulo, valor, "metric-up" if variacao>=0 else "metric-down",
+                 f'{"▲" if variacao>=0 else "▼"} {abs(variacao):.1f}%')
+
+
+# HTML de um card da prévia: o valor aproximado e, no lugar da variação, a margem do intervalo
+# de confiança de 95%
+def card_previa_html(icone, rotulo, valor, margem):
+    return _card(icone, f"{rotulo} (prévia)", f"≈ {valor}", "", f"± {margem} (IC 95%)")
@@ -0,0 +1,80 @@
+# Leitura de trechos (faixas de bytes) do CSV
+# Permite ler só as linhas acrescentadas ao final do arquivo desde a última carga, e também
+# limitar a leitura completa ao tamanho observado no início, para que linhas gravadas durante
+# a leitura não sejam contadas duas vezes
+
+import hashlib
+import io
+import os
+
+# Quantos bytes do início do arquivo e de antes do ponto já lido entram na assinatura
+# usada para detectar reescritas
+BYTES_ASSINATURA = 64 * 1024
+
+
+class _Trecho(io.RawIOBase):
+    # Entrega o cabeçalho do CSV seguido dos bytes [inicio, fim) do arquivo
+
+    def __init__(self, caminho, inicio, fim):
+        self._arquivo = open(caminho, "rb")
+        self._cabecalho = b""
+        if inicio > 0:
+            self._cabecalho = self._arquivo.readline()
+            self._arquivo.seek(inicio)
+        self._restante = max(0, fim - inicio) if inicio > 0 else fim
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        if self._cabecalho:
+            n = min(len(destino), len(self._cabecalho))
+            destino[:n] = self._cabecalho[:n]
+            self._cabecalho = self._cabecalho[n:]
+            return n
+        n = min(len(destino), self._restante)
+        if n <= 0:
+            return 0
+        lidos = self._arquivo.readinto(memoryview(destino)[:n])
+        self._restante -= lidos
+        return lidos
+
+    def close(self):
+        self._arquivo.close()
+        super().close()
+
+
+# Abre um trecho do CSV como arquivo de leitura (com o cabeçalho sempre na primeira linha)
+def abrir_trecho(caminho, inicio, fim):
+    return io.BufferedReader(_Trecho(caminho, inicio, fim))
+
+
+# Posição logo depois da última quebra de linha dentro dos primeiros "tamanho" bytes:
+# uma linha ainda sendo escrita no final do arquivo fica para a próxima leitura
+def fim_ultima_linha(caminho, tamanho, bloco=64 * 1024):
+    with open(caminho, "rb") as f:
+        posicao = tamanho
+        while posicao > 0:
+            inicio = max(0, posicao - bloco)
+            f.seek(inicio)
+            dados = f.read(posicao - inicio)
+            quebra = dados.rfind(b"\n")
+            if quebra >= 0:
+                return inicio + quebra + 1
+            posicao = inicio
+    return 0
+
+
+# Assinatura do conteúdo já lido: primeiros bytes do arquivo (com o cabeçalho) e últimos
+# bytes antes de "fim". Se o arquivo for truncado ou reescrito, a assinatura muda e a carga
+# incremental dá lugar a uma completa
+def assinatura(caminho, fim):
+    if os.path.getsize(caminho) < fim:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, "rb") as f:
+        h.update(f.read(min(fim, BYTES_ASSINATURA)))
+        inicio = max(0, fim - BYTES_ASSINATURA)
+        f.seek(inicio)
+        h.update(f.read(fim - inicio))
+    return h.hexdigest()
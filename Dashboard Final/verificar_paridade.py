@@ -0,0 +1,210 @@
+# Verificação de paridade entre os backends da dashboard
+# Calcula os números que aparecem na tela (cards, crescimentos e os dados de cada gráfico, em
+# cada granularidade) em várias combinações de filtros, com o pandas em memória, o pandas em
+# streaming, o SQLite e o mesmo CSV dividido numa pasta particionada por mês, e aponta qualquer
+# diferença. Algumas combinações têm também um período parcial, que passa pela Selecao (o
+# recorte de granularidades.recortar e a poda das partições pelas datas).
+# Uso: python verificar_paridade.py [caminho_do_csv]
+
+import datetime
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import banco_sqlite
+import crescimento
+import cubo
+import estatisticas_box
+import granularidades
+import graficos
+import reducao_pontos
+from cache_colunar import carregar_com_cache, carregar_varios_com_cache
+from configuracao import CAMINHO_DADOS, LARGURA_GRAFICO_PX, MEMORIA_MAX_MB
+from consultas import ConsultasPandas
+from ingestao import agregar_csv_em_blocos
+from particoes import ConsultasParticionadas
+from selecao import Selecao
+
+# Tolerância relativa para somas de ponto flutuante feitas em ordens diferentes
+TOLERANCIA = 1e-9
+
+
+# Escreve as linhas do CSV numa pasta particionada (<pasta>/<ano>/<mes>.csv), com os valores
+# como estão no arquivo; linhas sem Data válida ficam de fora, como em todos os backends
+def particionar(caminho, pasta):
+    df = pd.read_csv(caminho, dtype=str, keep_default_na=False)
+    datas = pd.to_datetime(df["Data"], errors="coerce").dropna()
+    for (ano, mes), parte in df.loc[datas.index].groupby([datas.dt.year, datas.dt.month]):
+        os.makedirs(os.path.join(pasta, f"{int(ano):04d}"), exist_ok=True)
+        parte.to_csv(os.path.join(pasta, f"{int(ano):04d}", f"{int(mes):02d}.csv"), index=False)
+
+
+def _carregar_pandas(caminho):
+    df = carregar_com_cache(caminho)
+    resumos = carregar_varios_com_cache(caminho,
+                                        lambda c, fonte: (cubo.montar(df), estatisticas_box.montar(df)),
+                                        ["cubo", "histograma"])
+    return ConsultasPandas(df, *resumos)
+
+
+def montar_backends(caminho, pasta_particoes):
+    particionar(caminho, pasta_particoes)
+    streaming = agregar_csv_em_blocos(caminho, MEMORIA_MAX_MB)
+    return {"pandas": _carregar_pandas(caminho),
+            "streaming": ConsultasPandas(None, *streaming),
+            "sqlite": banco_sqlite.ConsultasSQLite(banco_sqlite.preparar(caminho, MEMORIA_MAX_MB)),
+            "particoes": ConsultasParticionadas(pasta_particoes, _carregar_pandas, 1)}
+
+
+# Combinações de filtros verificadas: tudo, cada valor sozinho e algumas seleções parciais
+def combinacoes_filtros(opcoes):
+    regioes, projetos, anos = opcoes["Regiao"], opcoes["Projeto"], opcoes["Ano"]
+    combinacoes = [("tudo", regioes, projetos, anos),
+                   ("nada", [], projetos, anos)]
+    combinacoes += [(f"regiao={r}", [r], projetos, anos) for r in regioes]
+    combinacoes += [(f"projeto={p}", regioes, [p], anos) for p in projetos]
+    combinacoes += [(f"ano={a}", regioes, projetos, [a]) for a in anos]
+    combinacoes.append(("parcial", regioes[::2], projetos[1::2], anos[-2:]))
+    return combinacoes
+
+
+# Períodos parciais verificados, a partir das datas dos dados: um longo que começa e termina no
+# meio de semanas, meses e trimestres, um que atravessa a virada do ano e um de poucos dias
+def periodos_parciais(periodo):
+    data_min, data_max = (data.date() for data in periodo)
+    meio = data_min + (data_max - data_min) / 2
+    return [("periodo_longo", data_min + datetime.timedelta(days=45), data_max - datetime.timedelta(days=100)),
+            ("periodo_virada", datetime.date(data_min.year, 12, 10), datetime.date(data_min.year + 1, 2, 20)),
+            ("periodo_curto", meio, meio + datetime.timedelta(days=9))]
+
+
+# Pontos do gráfico de tendência de um nível do cubo: na largura do gráfico, numa bem menor,
+# que reduz qualquer projeto, e sem limite ("Resolução completa")
+def pontos_tendencia(df_nivel, granularidade):
+    return {f"fig5_tendencia_{granularidade}_{limite}":
+            reducao_pontos.reduzir_tendencia(graficos.dados_tendencia(df_nivel), limite).reset_index(drop=True)
+            for limite in [LARGURA_GRAFICO_PX, 20, None]}
+
+
+# Números exibidos pela dashboard para um filtro
+def numeros(consultas, regioes, projetos, anos):
+    df_cubo = consultas.cubo(regioes, projetos, anos)
+    df_hist = consultas.histograma(regioes, projetos, anos)
+    valores = {"linhas_cubo": df_cubo[cubo.LINHAS].sum(),
+               "custo_total": df_cubo["Custo_Reais"].sum()}
+    for metrica in cubo.METRICAS:
+        valores[f"media_{metrica}"] = cubo.media(df_cubo, metrica)
+    # O crescimento de cada janela é calculado no nível do cubo que a dashboard usa para ela
+    for janela in crescimento.JANELAS:
+        df_janela = consultas.cubo(regioes, projetos, anos, crescimento.NIVEIS[janela])
+        for chave, valor in crescimento.calcular_crescimentos(df_janela, janela).items():
+            valores[f"crescimento_{janela}_{chave}"] = valor
+    for granularidade in granularidades.GRANULARIDADES:
+        df_nivel = consultas.cubo(regioes, projetos, anos, granularidade)
+        for metrica in cubo.METRICAS:
+            valores[f"sparkline_{granularidade}_{metrica}"] = df_nivel.groupby("Data", observed=True)[metrica].sum()
+        valores.update(pontos_tendencia(df_nivel, granularidade))
+    valores["fig1_custo_total"] = df_cubo.groupby("Projeto", observed=True)["Custo_Reais"].sum()
+    valores["fig2_custo_medio"] = cubo.media_por(df_cubo, "Projeto", "Custo_Reais").set_index("Projeto")["Custo_Reais"]
+    valores["fig4_regioes"] = df_cubo.groupby("Regiao", observed=True)["Custo_Reais"].sum()
+    for projeto, resumo in estatisticas_box.resumo_por_projeto(df_hist).items():
+        for chave, valor in resumo.items():
+            valores[f"fig3_{projeto}_{chave}"] = valor
+    return valores
+
+
+# Números exibidos pela dashboard para um filtro com período parcial, pela Selecao, como na
+# dashboard e no exportador: cards e crescimentos, cada nível do cubo recortado, boxplot e tendência
+def numeros_periodo(consultas, regioes, projetos, anos, inicio, fim):
+    selecao = Selecao(consultas, regioes, projetos, anos, inicio, fim)
+    valores = {}
+    for janela in crescimento.JANELAS:
+        cards = selecao.cards(janela)
+        for chave, valor in cards.pop("crescimentos").items():
+            valores[f"crescimento_{janela}_{chave}"] = valor
+        valores.update(cards)
+    for granularidade in granularidades.GRANULARIDADES:
+        df_nivel = selecao.cubo(granularidade)
+        valores[f"linhas_{granularidade}"] = df_nivel[cubo.LINHAS].sum()
+        for metrica in cubo.METRICAS:
+            valores[f"sparkline_{granularidade}_{metrica}"] = df_nivel.groupby("Data", observed=True)[metrica].sum()
+        valores.update(pontos_tendencia(df_nivel, granularidade))
+    for projeto, resumo in estatisticas_box.resumo_por_projeto(selecao.histograma()).items():
+        for chave, valor in resumo.items():
+            valores[f"fig3_{projeto}_{chave}"] = valor
+    return valores
+
+
+def _iguais(a, b):
+    if isinstance(a, pd.DataFrame):
+        return (isinstance(b, pd.DataFrame)
+                and list(a.columns) == list(b.columns)
+                and all(_iguais(a[coluna], b[coluna]) for coluna in a.columns))
+    if isinstance(a, pd.Series):
+        if not isinstance(b, pd.Series) or len(a) != len(b):
+            return False
+        if not a.index.astype(str).equals(b.index.astype(str)):
+            return False
+        a, b = a.to_numpy(), b.to_numpy()
+        if a.dtype.kind in "fiu" and b.dtype.kind in "fiu":
+            return bool(np.allclose(a, b, rtol=TOLERANCIA, atol=0, equal_nan=True))
+        return [str(v) for v in a] == [str(v) for v in b]
+    if isinstance(a, list):
+        return len(a) == len(b) and np.allclose(a, b, rtol=TOLERANCIA, atol=0)
+    if isinstance(a, (int, float, np.number)):
+        return bool(np.isclose(a, b, rtol=TOLERANCIA, atol=0, equal_nan=True))
+    return a == b
+
+
+# Compara os números de um filtro em cada backend com os do primeiro
+def _comparar_numeros(backends, rotulo, calcular):
+    nomes = list(backends)
+    esperados = calcular(backends[nomes[0]])
+    diferencas = []
+    for nome in nomes[1:]:
+        obtidos = calcular(backends[nome])
+        for chave, valor in esperados.items():
+            if chave not in obtidos or not _iguais(valor, obtidos[chave]):
+                diferencas.append((nome, rotulo, chave))
+        for chave in obtidos.keys() - esperados.keys():
+            diferencas.append((nome, rotulo, chave))
+    return diferencas
+
+
+# Compara os números de cada backend com os do primeiro e devolve as diferenças encontradas
+def comparar(backends):
+    nomes = list(backends)
+    referencia = backends[nomes[0]]
+    diferencas = []
+    opcoes = referencia.opcoes()
+    for nome in nomes[1:]:
+        outras = backends[nome].opcoes()
+        for dimensao, valores in opcoes.items():
+            if [str(v) for v in valores] != [str(v) for v in outras[dimensao]]:
+                diferencas.append((nome, "opções", dimensao))
+
+    combinacoes = combinacoes_filtros(opcoes)
+    for rotulo, regioes, projetos, anos in combinacoes:
+        diferencas += _comparar_numeros(backends, rotulo,
+                                        lambda consultas: numeros(consultas, regioes, projetos, anos))
+    # Os períodos parciais só com alguns filtros, que a Selecao refaz em cada nível
+    if referencia.periodo()[0] is not None:
+        for rotulo, regioes, projetos, anos in [c for c in combinacoes if c[0] in ("tudo", "parcial")]:
+            for rotulo_periodo, inicio, fim in periodos_parciais(referencia.periodo()):
+                diferencas += _comparar_numeros(backends, f"{rotulo} {rotulo_periodo}",
+                                                lambda consultas: numeros_periodo(consultas, regioes, projetos,
+                                                                                  anos, inicio, fim))
+    return diferencas
+
+
+if __name__ == "__main__":
+    caminho = sys.argv[1] if len(sys.argv) > 1 else CAMINHO_DADOS
+    with tempfile.TemporaryDirectory() as pasta_particoes:
+        diferencas = comparar(montar_backends(caminho, pasta_particoes))
+    for nome, rotulo, chave in diferencas:
+        print(f"DIFERENTE  {nome:<10} {rotulo:<30} {chave}")
+    print("Backends com os mesmos números" if not diferencas else f"{len(diferencas)} diferenças")
+    sys.exit(1 if diferencas else 0)